@@ -9,10 +9,6 @@ relationships for intelligent code analysis and search, implemented as an MCP se
 import asyncio
 import argparse
 import sys
-from pathlib import Path
-
-# Add src to Python path
-sys.path.insert(0, str(Path(__file__).parent / "src"))
 
 from src.config import settings
 from src.mcp.server import CodeRetrievalMCP
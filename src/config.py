@@ -27,12 +27,17 @@ class Settings(BaseSettings):
     
     ollama_host: str = Field(default="http://localhost:11434", env="OLLAMA_HOST")
     ollama_model: str = Field(default="nomic-embed-text", env="OLLAMA_MODEL")
+    # Texts per OpenAI embedding request, and how many requests may be in flight at once
+    embedding_batch_size: int = Field(default=1000, env="EMBEDDING_BATCH_SIZE")
+    embedding_max_concurrency: int = Field(default=10, env="EMBEDDING_MAX_CONCURRENCY")
     
     # Search Configuration
     bm25_k1: float = Field(default=1.2, env="BM25_K1")
     bm25_b: float = Field(default=0.75, env="BM25_B")
     top_k_results: int = Field(default=10, env="TOP_K_RESULTS")
     rerank_threshold: float = Field(default=0.5, env="RERANK_THRESHOLD")
+    # Directory the BM25 index is saved to after indexing and loaded from at startup; off when unset
+    bm25_index_path: Optional[str] = Field(default=None, env="BM25_INDEX_PATH")
     
     # File Processing Configuration
     max_chunk_size: int = Field(default=1000, env="MAX_CHUNK_SIZE")
@@ -41,6 +46,8 @@ class Settings(BaseSettings):
         default=".py,.js,.ts,.java,.cpp,.c,.go,.rs,.md,.txt,.json,.yaml,.yml,.xml,.html,.css,.sql,.sh,.rb,.php,.swift,.kt,.scala,.dart,.vue,.jsx,.tsx",
         env="SUPPORTED_EXTENSIONS"
     )
+    # SQLite file for caching AST chunks between runs; caching is off when unset
+    ast_cache_path: Optional[str] = Field(default=None, env="AST_CACHE_PATH")
     
     # MCP Configuration
     mcp_host: str = Field(default="localhost", env="MCP_HOST")
@@ -16,6 +16,7 @@ class OllamaEmbeddingProvider:
         self.model = model
         self.logger = app_logger.bind(component="ollama_embedding")
         self.dimension = 768  # nomic-embed-text dimension
+        self.batch_size = 1  # the embeddings endpoint takes one prompt per request
         self.session = requests.Session()
     
     async def embed_text(self, text: str) -> List[float]:
@@ -59,6 +60,7 @@ class OpenAIEmbeddingProvider:
         self.model = model
         self.logger = app_logger.bind(component="openai_embedding")
         self.dimension = 1536  # OpenAI ada-002 dimension
+        self.batch_size = settings.embedding_batch_size
     
     async def embed_text(self, text: str) -> List[float]:
         """Generate embedding for a single text."""
@@ -125,8 +127,29 @@ class EmbeddingService:
         return await self.provider.embed_text(text)
     
     async def embed_texts(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for multiple texts."""
-        return await self.provider.embed_texts(texts)
+        """Generate embeddings for multiple texts.
+        
+        Texts are split into provider-sized batches whose requests run concurrently,
+        at most ``settings.embedding_max_concurrency`` at a time.
+        """
+        if not texts:
+            return []
+        
+        batch_size = max(1, self.provider.batch_size)
+        if len(texts) <= batch_size:
+            return await self.provider.embed_texts(texts)
+        
+        semaphore = asyncio.Semaphore(max(1, settings.embedding_max_concurrency))
+        
+        async def embed_batch(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await self.provider.embed_texts(batch)
+        
+        batches = await asyncio.gather(*(
+            embed_batch(texts[start:start + batch_size])
+            for start in range(0, len(texts), batch_size)
+        ))
+        return [embedding for batch in batches for embedding in batch]
     
     async def embed_chunks(self, chunks) -> List:
         """Generate embeddings for chunks and update them."""
@@ -139,8 +162,8 @@ class EmbeddingService:
         # Generate embeddings
         embeddings = await self.embed_texts(texts)
         
-        # Update chunks with embeddings
-        for chunk, embedding in zip(chunks, embeddings):
+        # Update chunks with rows of one float32 matrix
+        for chunk, embedding in zip(chunks, np.asarray(embeddings, dtype=np.float32)):
             chunk.embedding = embedding
         
         return chunks
@@ -157,20 +180,24 @@ class EmbeddingService:
                               document_embeddings: List[List[float]], 
                               top_k: int = 10) -> List[Dict[str, Any]]:
         """Perform similarity search using embeddings."""
-        if not document_embeddings:
+        if len(document_embeddings) == 0 or top_k <= 0:
             return []
         
-        # Convert to numpy arrays for efficient computation
-        query_np = np.array(query_embedding)
-        doc_np = np.array(document_embeddings)
+        # Convert to float32 arrays, the embeddings' own dtype, so the product runs as one sgemv
+        query_np = np.asarray(query_embedding, dtype=np.float32)
+        doc_np = np.asarray(document_embeddings, dtype=np.float32)
         
         # Calculate cosine similarity
-        similarities = np.dot(doc_np, query_np) / (
+        similarities = (doc_np @ query_np) / (
             np.linalg.norm(doc_np, axis=1) * np.linalg.norm(query_np)
         )
         
-        # Get top-k results
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        # Get top-k results: partition out the k best, then sort only those
+        if top_k < len(similarities):
+            top_indices = np.argpartition(similarities, -top_k)[-top_k:]
+        else:
+            top_indices = np.arange(len(similarities))
+        top_indices = top_indices[np.argsort(similarities[top_indices])[::-1]]
         
         results = []
         for idx in top_indices:
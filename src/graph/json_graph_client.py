@@ -1,7 +1,15 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
+from contextlib import contextmanager
 import json
 import os
 from pathlib import Path
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 from ..types import GraphNode, GraphEdge, GraphResult, CodeChunk
 from ..utils.logger import app_logger
 
@@ -9,9 +17,11 @@ from ..utils.logger import app_logger
 class JsonGraphClient:
     """JSON-based graph storage client."""
     
-    def __init__(self, storage_path: str = "graph_data.json"):
+    def __init__(self, storage_path: str = "graph_data.json", pretty: bool = False):
         self.logger = app_logger.bind(component="json_graph_client")
         self.storage_path = Path(storage_path)
+        # Indent the saved file for reading by hand; compact output is smaller and faster to write
+        self.pretty = pretty
         self.storage_path.parent.mkdir(parents=True, exist_ok=True)
         
         # Initialize data structure
@@ -25,6 +35,10 @@ class JsonGraphClient:
             }
         }
         
+        # Nesting depth of bulk() blocks, and whether a save was skipped inside one
+        self._bulk_depth = 0
+        self._save_pending = False
+        
         # Load existing data if file exists
         self._load_data()
     
@@ -32,8 +46,11 @@ class JsonGraphClient:
         """Load data from JSON file."""
         if self.storage_path.exists():
             try:
-                with open(self.storage_path, 'r', encoding='utf-8') as f:
-                    self.data = json.load(f)
+                if ORJSON_AVAILABLE:
+                    self.data = orjson.loads(self.storage_path.read_bytes())
+                else:
+                    with open(self.storage_path, 'r', encoding='utf-8') as f:
+                        self.data = json.load(f)
                 self.logger.info(f"Loaded graph data from {self.storage_path}")
             except Exception as e:
                 self.logger.error(f"Error loading graph data: {e}")
@@ -53,16 +70,45 @@ class JsonGraphClient:
             }
         }
     
+    @contextmanager
+    def bulk(self) -> Iterator["JsonGraphClient"]:
+        """Defer saving until the block exits, so a batch of writes rewrites the file once."""
+        self._bulk_depth += 1
+        try:
+            yield self
+        finally:
+            self._bulk_depth -= 1
+            if self._bulk_depth == 0 and self._save_pending:
+                self._save_data()
+    
     def _save_data(self):
         """Save data to JSON file."""
+        if self._bulk_depth:
+            self._save_pending = True
+            return
+        
+        self._save_pending = False
         try:
             import datetime
             self.data["metadata"]["updated_at"] = datetime.datetime.now().isoformat()
             if not self.data["metadata"]["created_at"]:
                 self.data["metadata"]["created_at"] = self.data["metadata"]["updated_at"]
             
-            with open(self.storage_path, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
+            # Write a temporary file and swap it in, so readers never see a partial graph
+            temp_path = self.storage_path.with_name(self.storage_path.name + ".tmp")
+            if ORJSON_AVAILABLE:
+                # Same UTF-8 JSON as the json module writes, serialized in C
+                option = orjson.OPT_NON_STR_KEYS
+                if self.pretty:
+                    option |= orjson.OPT_INDENT_2
+                temp_path.write_bytes(orjson.dumps(self.data, option=option))
+            else:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    if self.pretty:
+                        json.dump(self.data, f, indent=2, ensure_ascii=False)
+                    else:
+                        json.dump(self.data, f, separators=(',', ':'), ensure_ascii=False)
+            os.replace(temp_path, self.storage_path)
             self.logger.debug(f"Saved graph data to {self.storage_path}")
         except Exception as e:
             self.logger.error(f"Error saving graph data: {e}")
@@ -223,24 +269,48 @@ class JsonGraphClient:
     def find_related_chunks(self, chunk_id: str, relationship_types: List[str] = None, 
                           max_hops: int = 2) -> GraphResult:
         """Find chunks related to a given chunk."""
+        results = self.find_related_chunks_batch([chunk_id], relationship_types, max_hops)
+        return results.get(chunk_id, GraphResult(nodes=[], edges=[], metadata={"error": "No results found"}))
+    
+    def find_related_chunks_batch(self, chunk_ids: List[str], relationship_types: List[str] = None,
+                                  max_hops: int = 2) -> Dict[str, GraphResult]:
+        """Find chunks related to each of the given chunks in a single pass over the edges.
+        
+        Chunks that are not nodes in the graph are left out of the result.
+        """
         if relationship_types is None:
             relationship_types = ["CALLS", "DEFINED_IN", "CONTAINS", "HAS_METHOD", "INHERITS_FROM"]
         
-        nodes = []
-        edges = []
-        
         # Find direct relationships
+        nodes = self.data["nodes"]
+        edges_by_chunk = {chunk_id: [] for chunk_id in chunk_ids if chunk_id in nodes}
         for edge in self.data["edges"]:
             if edge["relationship_type"] in relationship_types:
-                if edge["source_id"] == chunk_id or edge["target_id"] == chunk_id:
-                    # Add edge
-                    edges.append(GraphEdge(**edge))
-                    
-                    # Add related nodes
-                    for node_id in [edge["source_id"], edge["target_id"]]:
-                        if node_id in self.data["nodes"]:
-                            node_data = self.data["nodes"][node_id]
-                            nodes.append(GraphNode(**node_data))
+                source_id, target_id = edge["source_id"], edge["target_id"]
+                if source_id in edges_by_chunk:
+                    edges_by_chunk[source_id].append(edge)
+                if target_id != source_id and target_id in edges_by_chunk:
+                    edges_by_chunk[target_id].append(edge)
+        
+        return {
+            chunk_id: self._build_related_result(edges, max_hops)
+            for chunk_id, edges in edges_by_chunk.items()
+        }
+    
+    def _build_related_result(self, related_edges: List[Dict[str, Any]], max_hops: int) -> GraphResult:
+        """Build a related-chunks result from the edges touching a chunk."""
+        nodes = []
+        edges = []
+        
+        for edge in related_edges:
+            # Add edge
+            edges.append(GraphEdge(**edge))
+            
+            # Add related nodes
+            for node_id in [edge["source_id"], edge["target_id"]]:
+                if node_id in self.data["nodes"]:
+                    node_data = self.data["nodes"][node_id]
+                    nodes.append(GraphNode(**node_data))
         
         # Remove duplicates by ID
         unique_nodes = []
@@ -376,59 +446,38 @@ class JsonGraphClient:
     
     def get_file_structure(self, file_path: str) -> GraphResult:
         """Get the complete structure of a file including functions and classes."""
-        nodes = []
-        edges = []
+        nodes = self.data["nodes"]
         
         # Find file node
-        if file_path not in self.data["nodes"]:
+        if file_path not in nodes:
             return GraphResult(nodes=[], edges=[], metadata={"error": "File not found"})
         
-        file_node = GraphNode(**self.data["nodes"][file_path])
-        nodes.append(file_node)
+        # Collect ids first and build each node and edge once; dicts keep first-seen order
+        node_ids = {file_path: None}
+        edges_by_key = {}
+        
+        def add_edge(edge: Dict[str, Any]):
+            edges_by_key.setdefault(
+                (edge["source_id"], edge["target_id"], edge["relationship_type"]), edge
+            )
+            for node_id in (edge["source_id"], edge["target_id"]):
+                if node_id in nodes:
+                    node_ids.setdefault(node_id)
         
         # Find all relationships related to this file
         for edge in self.data["edges"]:
             if edge["source_id"] == file_path or edge["target_id"] == file_path:
-                edges.append(GraphEdge(**edge))
-                
-                # Add related nodes
-                for node_id in [edge["source_id"], edge["target_id"]]:
-                    if node_id in self.data["nodes"] and node_id != file_path:
-                        node_data = self.data["nodes"][node_id]
-                        nodes.append(GraphNode(**node_data))
+                add_edge(edge)
         
         # Also find all nodes connected to the chunks (functions, classes, etc.)
-        chunk_ids = [node.id for node in nodes if node.type == "Chunk"]
+        chunk_ids = {node_id for node_id in node_ids if nodes[node_id]["type"] == "Chunk"}
         for edge in self.data["edges"]:
             if edge["source_id"] in chunk_ids or edge["target_id"] in chunk_ids:
-                edges.append(GraphEdge(**edge))
-                
-                # Add related nodes
-                for node_id in [edge["source_id"], edge["target_id"]]:
-                    if node_id in self.data["nodes"] and node_id != file_path:
-                        node_data = self.data["nodes"][node_id]
-                        nodes.append(GraphNode(**node_data))
-        
-        # Remove duplicates by ID
-        unique_nodes = []
-        node_ids = set()
-        for node in nodes:
-            if node.id not in node_ids:
-                unique_nodes.append(node)
-                node_ids.add(node.id)
-        
-        # Remove duplicate edges by source-target-type combination
-        unique_edges = []
-        edge_keys = set()
-        for edge in edges:
-            edge_key = (edge.source_id, edge.target_id, edge.relationship_type)
-            if edge_key not in edge_keys:
-                unique_edges.append(edge)
-                edge_keys.add(edge_key)
+                add_edge(edge)
         
         return GraphResult(
-            nodes=unique_nodes,
-            edges=unique_edges,
+            nodes=[GraphNode(**nodes[node_id]) for node_id in node_ids],
+            edges=[GraphEdge(**edge) for edge in edges_by_key.values()],
             metadata={"query_type": "file_structure", "file_path": file_path},
         )
     
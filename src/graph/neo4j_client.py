@@ -6,6 +6,9 @@ from ..config import settings
 from ..types import GraphNode, GraphEdge, GraphResult, CodeChunk
 from ..utils.logger import app_logger
 
+# Rows sent per UNWIND statement by the bulk create methods
+BULK_BATCH_SIZE = 500
+
 
 class Neo4jClient:
     """Neo4j client for graph database operations."""
@@ -136,6 +139,88 @@ class Neo4jClient:
         
         raise Exception(f"Failed to create chunk node: {chunk.id}")
     
+    def _run_bulk(self, query: str, rows: List[Dict[str, Any]], batch_size: int) -> int:
+        """Run an UNWIND $rows query over rows in batches and return the number of rows written."""
+        written = 0
+        with self.driver.session() as session:
+            for start in range(0, len(rows), batch_size):
+                record = session.run(query, rows=rows[start:start + batch_size]).single()
+                if record:
+                    written += record["written"]
+        return written
+    
+    def create_file_nodes_bulk(self, files: List[Dict[str, Any]], batch_size: int = BULK_BATCH_SIZE) -> int:
+        """Create or update file nodes with one query per batch.
+        
+        Each entry takes the create_file_node arguments as keys: file_path, language,
+        file_type and metadata. Returns the number of nodes written.
+        """
+        query = """
+        UNWIND $rows AS row
+        MERGE (f:File {path: row.path})
+        SET f.language = row.language,
+            f.file_type = row.file_type,
+            f.file_size = row.file_size,
+            f.updated_at = datetime()
+        RETURN count(f) AS written
+        """
+        
+        rows = [
+            {
+                "path": file["file_path"],
+                "language": file["language"],
+                "file_type": file["file_type"],
+                "file_size": (file.get("metadata") or {}).get("file_size", 0),
+            }
+            for file in files
+        ]
+        return self._run_bulk(query, rows, batch_size)
+    
+    def create_chunk_nodes_bulk(self, chunks: List[CodeChunk], batch_size: int = BULK_BATCH_SIZE) -> int:
+        """Create or update chunk nodes with one query per batch; returns the number written."""
+        query = """
+        UNWIND $rows AS row
+        MERGE (c:Chunk {id: row.id})
+        SET c += row.props,
+            c.updated_at = datetime()
+        RETURN count(c) AS written
+        """
+        
+        rows = []
+        for chunk in chunks:
+            metadata = chunk.metadata or {}
+            rows.append({
+                "id": chunk.id,
+                "props": {
+                    "content": chunk.content,
+                    "start_line": chunk.start_line,
+                    "end_line": chunk.end_line,
+                    "language": chunk.language,
+                    "chunk_type": chunk.chunk_type,
+                    "file_size": metadata.get('file_size', 0),
+                    "chunk_index": metadata.get('chunk_index', 0),
+                    "ast_node_type": metadata.get('ast_node_type', ''),
+                },
+            })
+        return self._run_bulk(query, rows, batch_size)
+    
+    def create_file_chunk_relationships_bulk(self, pairs: List[Tuple[str, str]],
+                                             batch_size: int = BULK_BATCH_SIZE) -> int:
+        """Create CONTAINS relationships for (file_path, chunk_id) pairs with one query per batch.
+        
+        Pairs whose file or chunk node doesn't exist are skipped. Returns the number written.
+        """
+        query = """
+        UNWIND $rows AS row
+        MATCH (f:File {path: row.file_path}), (c:Chunk {id: row.chunk_id})
+        MERGE (f)-[r:CONTAINS]->(c)
+        SET r.updated_at = datetime()
+        RETURN count(r) AS written
+        """
+        
+        rows = [{"file_path": file_path, "chunk_id": chunk_id} for file_path, chunk_id in pairs]
+        return self._run_bulk(query, rows, batch_size)
+    
     def create_function_node(self, name: str, qualified_name: str, file_path: str, 
                            line_number: int, metadata: Dict[str, Any]) -> GraphNode:
         """Create or update a function node."""
@@ -285,46 +370,78 @@ class Neo4jClient:
             record = result.single()
             
             if record:
-                nodes = []
-                edges = []
-                
-                # Process nodes
-                for node_data in record["nodes"]:
-                    if node_data.get("id"):
-                        nodes.append(GraphNode(
-                            id=node_data.get("id"),
-                            type=list(node_data.labels)[0] if node_data.labels else "Unknown",
-                            properties=dict(node_data),
-                            file_path=node_data.get("file_path", ""),
-                            line_number=node_data.get("line_number", 0),
-                        ))
-                
-                # Process edges
-                for edge_data in record["relationships"]:
-                    if edge_data and len(edge_data) >= 3 and edge_data[0] and edge_data[1]:
-                        source_id = (edge_data[0].get("id") or 
-                                   edge_data[0].get("qualified_name") or 
-                                   edge_data[0].get("path"))
-                        target_id = (edge_data[1].get("id") or 
-                                   edge_data[1].get("qualified_name") or 
-                                   edge_data[1].get("path"))
-                        
-                        if source_id and target_id:
-                            edges.append(GraphEdge(
-                                source_id=source_id,
-                                target_id=target_id,
-                                relationship_type=edge_data[2],
-                                properties=edge_data[3] if len(edge_data) > 3 else {},
-                            ))
-                
-                return GraphResult(
-                    nodes=nodes,
-                    edges=edges,
-                    metadata={"query_type": "related_chunks", "max_hops": max_hops},
-                )
+                return self._record_to_related_result(record, max_hops)
         
         return GraphResult(nodes=[], edges=[], metadata={"error": "No results found"})
     
+    def find_related_chunks_batch(self, chunk_ids: List[str], relationship_types: List[str] = None,
+                                  max_hops: int = 2) -> Dict[str, GraphResult]:
+        """Find chunks related to each of the given chunks in a single query.
+        
+        Chunks that are not nodes in the graph are left out of the result.
+        """
+        if relationship_types is None:
+            relationship_types = ["CALLS", "DEFINED_IN", "CONTAINS", "HAS_METHOD", "INHERITS_FROM"]
+        
+        rel_types_pattern = "|".join(relationship_types)
+        
+        query = """
+        UNWIND $chunk_ids AS chunk_id
+        MATCH (c:Chunk {id: chunk_id})
+        OPTIONAL MATCH (c)-[r:%s]-(related)
+        WHERE related:Chunk OR related:Function OR related:Class
+        RETURN chunk_id,
+               collect(DISTINCT c) + collect(DISTINCT related) as nodes,
+               collect(DISTINCT [startNode(r), endNode(r), type(r), properties(r)]) as relationships
+        """ % rel_types_pattern
+        
+        results = {}
+        with self.driver.session() as session:
+            for record in session.run(query, chunk_ids=list(chunk_ids)):
+                results[record["chunk_id"]] = self._record_to_related_result(record, max_hops)
+        
+        return results
+    
+    def _record_to_related_result(self, record, max_hops: int) -> GraphResult:
+        """Convert a related-chunks query record into a graph result."""
+        nodes = []
+        edges = []
+        
+        # Process nodes
+        for node_data in record["nodes"]:
+            if node_data.get("id"):
+                nodes.append(GraphNode(
+                    id=node_data.get("id"),
+                    type=list(node_data.labels)[0] if node_data.labels else "Unknown",
+                    properties=dict(node_data),
+                    file_path=node_data.get("file_path", ""),
+                    line_number=node_data.get("line_number", 0),
+                ))
+        
+        # Process edges
+        for edge_data in record["relationships"]:
+            if edge_data and len(edge_data) >= 3 and edge_data[0] and edge_data[1]:
+                source_id = (edge_data[0].get("id") or 
+                           edge_data[0].get("qualified_name") or 
+                           edge_data[0].get("path"))
+                target_id = (edge_data[1].get("id") or 
+                           edge_data[1].get("qualified_name") or 
+                           edge_data[1].get("path"))
+                
+                if source_id and target_id:
+                    edges.append(GraphEdge(
+                        source_id=source_id,
+                        target_id=target_id,
+                        relationship_type=edge_data[2],
+                        properties=edge_data[3] if len(edge_data) > 3 else {},
+                    ))
+        
+        return GraphResult(
+            nodes=nodes,
+            edges=edges,
+            metadata={"query_type": "related_chunks", "max_hops": max_hops},
+        )
+    
     def find_function_dependencies(self, function_qualified_name: str) -> GraphResult:
         """Find function dependencies (what functions this function calls)."""
         query = """
@@ -528,26 +645,25 @@ class Neo4jClient:
     
     def get_database_stats(self) -> Dict[str, Any]:
         """Get database statistics."""
-        stats = {}
-        
-        # Count nodes by type
-        node_counts = """
-        MATCH (n)
-        RETURN labels(n)[0] as label, count(n) as count
-        """
-        
-        with self.driver.session() as session:
-            result = session.run(node_counts)
-            stats["nodes"] = {record["label"]: record["count"] for record in result}
-        
-        # Count relationships by type
-        rel_counts = """
-        MATCH ()-[r]->()
-        RETURN type(r) as type, count(r) as count
+        # Count nodes by label and relationships by type in one round trip
+        query = """
+        CALL {
+            MATCH (n)
+            WITH labels(n)[0] AS label, count(n) AS count
+            RETURN collect({label: label, count: count}) AS node_counts
+        }
+        CALL {
+            MATCH ()-[r]->()
+            WITH type(r) AS type, count(r) AS count
+            RETURN collect({type: type, count: count}) AS rel_counts
+        }
+        RETURN node_counts, rel_counts
         """
         
         with self.driver.session() as session:
-            result = session.run(rel_counts)
-            stats["relationships"] = {record["type"]: record["count"] for record in result}
+            record = session.run(query).single()
         
-        return stats
\ No newline at end of file
+        return {
+            "nodes": {row["label"]: row["count"] for row in record["node_counts"]},
+            "relationships": {row["type"]: row["count"] for row in record["rel_counts"]},
+        }
\ No newline at end of file
@@ -0,0 +1,77 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+from ..types import CodeChunk, CodeFile
+from ..utils.logger import app_logger
+
+
+# Bump when AST chunking changes so entries written by older code are ignored
+CACHE_VERSION = "2"
+
+
+class ASTCache:
+    """SQLite-backed cache of AST chunks, keyed by a file's path and content and the parser backend.
+    
+    Any change to the file's content or to the parser that chunks it gives it a new key, so
+    stale entries are never returned; they are only left behind until the cache file is deleted.
+    """
+    
+    def __init__(self, path: str):
+        self.logger = app_logger.bind(component="ast_cache")
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # One connection per cache, shared between threads under a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS chunks (key BLOB PRIMARY KEY, chunks TEXT NOT NULL)")
+        self._conn.commit()
+        self.logger.debug(f"Opened AST cache at {self.path}")
+    
+    @staticmethod
+    def make_key(code_file: CodeFile, backend: str) -> bytes:
+        """Hash everything that AST chunking reads from the file, and the backend that parses it."""
+        digest = hashlib.sha256()
+        for part in (CACHE_VERSION, backend, code_file.path, code_file.language or "",
+                     code_file.file_type.value, str(code_file.size)):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        digest.update((code_file.content or "").encode())
+        return digest.digest()
+    
+    def get(self, code_file: CodeFile, backend: str) -> Optional[List[CodeChunk]]:
+        """Get cached chunks for a file, or None on a miss or a database error."""
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT chunks FROM chunks WHERE key = ?", (self.make_key(code_file, backend),)
+                ).fetchone()
+        except sqlite3.Error as e:
+            self.logger.warning(f"AST cache read failed for {code_file.path}, parsing instead: {e}")
+            return None
+        
+        if row is None:
+            return None
+        return [CodeChunk(**chunk) for chunk in json.loads(row[0])]
+    
+    def put(self, code_file: CodeFile, backend: str, chunks: List[CodeChunk]):
+        """Store the chunks produced for a file; a database error only skips the write."""
+        payload = json.dumps([chunk.to_dict() for chunk in chunks])
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO chunks (key, chunks) VALUES (?, ?)",
+                    (self.make_key(code_file, backend), payload),
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            self.logger.warning(f"AST cache write failed for {code_file.path}, not caching it: {e}")
+    
+    def close(self):
+        """Close the cache database."""
+        with self._lock:
+            self._conn.close()
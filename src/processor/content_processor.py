@@ -1,5 +1,9 @@
+import ast
 import re
+import sys
 import hashlib
+import sqlite3
+from importlib import metadata
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 
@@ -18,6 +22,45 @@ from langchain.text_splitter import (
 from ..config import settings
 from ..types import CodeChunk, CodeFile
 from ..utils.logger import app_logger
+from .ast_cache import ASTCache
+
+
+class PythonStdlibParser:
+    """Python parser built on the standard library's ast module.
+    
+    Used when tree-sitter has no Python parser; produces the same node types and
+    line ranges as tree-sitter's function_definition and class_definition nodes.
+    """
+    
+    NODE_TYPES = {
+        ast.FunctionDef: 'function_definition',
+        ast.AsyncFunctionDef: 'function_definition',
+        ast.ClassDef: 'class_definition',
+    }
+    
+    def extract_nodes(self, code: str) -> List[Dict[str, Any]]:
+        """Extract function and class nodes in source order."""
+        tree = ast.parse(code)
+        lines = code.split('\n')
+        
+        nodes = []
+        self._extract_nodes(tree, nodes, lines)
+        return nodes
+    
+    def _extract_nodes(self, node: ast.AST, nodes: List[Dict[str, Any]], lines: List[str]):
+        """Extract nodes depth-first, matching tree-sitter's traversal order."""
+        node_type = self.NODE_TYPES.get(type(node))
+        if node_type:
+            nodes.append({
+                'type': node_type,
+                'start_line': node.lineno,
+                'end_line': node.end_lineno,
+                'content': lines[node.lineno-1:node.end_lineno],
+                'node': node,
+            })
+        
+        for child in ast.iter_child_nodes(node):
+            self._extract_nodes(child, nodes, lines)
 
 
 class ASTParser:
@@ -26,13 +69,26 @@ class ASTParser:
     def __init__(self):
         self.logger = app_logger.bind(component="ast_parser")
         self.parsers = {}
+        self.tree_sitter_version = None
         self._initialize_parsers()
     
     def _initialize_parsers(self):
-        """Initialize tree-sitter parsers for supported languages."""
-        if not TREE_SITTER_AVAILABLE:
-            self.logger.warning("Tree-sitter not available, AST parsing will be disabled")
-            return
+        """Initialize parsers for supported languages."""
+        if TREE_SITTER_AVAILABLE:
+            self._initialize_tree_sitter_parsers()
+        else:
+            self.logger.warning("Tree-sitter not available, AST parsing will be disabled for all languages but Python")
+        
+        # Python can always be parsed with the standard library
+        if 'python' not in self.parsers:
+            self.parsers['python'] = PythonStdlibParser()
+            self.logger.info("Initialized standard library parser for python")
+    
+    def _initialize_tree_sitter_parsers(self):
+        """Initialize tree-sitter parsers for the languages that have one."""
+        self.tree_sitter_version = "+".join(
+            self._package_version(package) for package in ("tree-sitter", "tree-sitter-languages")
+        )
         
         supported_languages = {
             'python': 'python',
@@ -55,6 +111,23 @@ class ASTParser:
             except Exception as e:
                 self.logger.warning(f"Failed to initialize parser for {lang_name}: {e}")
     
+    @staticmethod
+    def _package_version(package: str) -> str:
+        """Get an installed package's version, or "unknown" if it isn't installed as a distribution."""
+        try:
+            return metadata.version(package)
+        except metadata.PackageNotFoundError:
+            return "unknown"
+    
+    def backend(self, language: str) -> str:
+        """Name the parser backend and version used for a language.
+        
+        Different backends can chunk the same file differently, so cached chunks are keyed by it.
+        """
+        if isinstance(self.parsers.get(language), PythonStdlibParser):
+            return f"stdlib-ast-{sys.version_info.major}.{sys.version_info.minor}"
+        return f"tree-sitter-{self.tree_sitter_version}"
+    
     def parse_code(self, code: str, language: str) -> List[Dict[str, Any]]:
         """Parse code and extract AST nodes."""
         if language not in self.parsers:
@@ -62,6 +135,9 @@ class ASTParser:
         
         try:
             parser = self.parsers[language]
+            if isinstance(parser, PythonStdlibParser):
+                return parser.extract_nodes(code)
+            
             tree = parser.parse(bytes(code, 'utf8'))
             
             nodes = []
@@ -93,10 +169,18 @@ class ASTParser:
 class ContentProcessor:
     """Content processor for chunking and embedding generation."""
     
-    def __init__(self):
+    def __init__(self, ast_cache: Optional[ASTCache] = None):
         self.logger = app_logger.bind(component="content_processor")
         self.ast_parser = ASTParser()
         self.text_splitter = self._create_text_splitter()
+        
+        # Reuse chunks for files whose content hasn't changed since an earlier run
+        if ast_cache is None and settings.ast_cache_path:
+            try:
+                ast_cache = ASTCache(settings.ast_cache_path)
+            except (sqlite3.Error, OSError) as e:
+                self.logger.warning(f"Could not open AST cache at {settings.ast_cache_path}, caching disabled: {e}")
+        self.ast_cache = ast_cache
     
     def _create_text_splitter(self):
         """Create text splitter based on configuration."""
@@ -134,7 +218,16 @@ class ContentProcessor:
             self.logger.warning(f"AST parser failed to initialize for {code_file.language}, skipping file: {code_file.path}")
             return []
         
-        return self._process_with_ast(code_file)
+        if self.ast_cache is None:
+            return self._process_with_ast(code_file)
+        
+        backend = self.ast_parser.backend(code_file.language)
+        chunks = self.ast_cache.get(code_file, backend)
+        if chunks is None:
+            chunks = self._process_with_ast(code_file)
+            self.ast_cache.put(code_file, backend, chunks)
+        
+        return chunks
     
     def _process_with_ast(self, code_file: CodeFile) -> List[CodeChunk]:
         """Process file using AST-based chunking."""
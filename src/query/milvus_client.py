@@ -7,30 +7,50 @@ from pymilvus import (
     DataType,
     Collection,
 )
+import json
 import numpy as np
 
 from ..config import settings
-from ..types import CodeChunk, SearchResult
+from ..types import CodeChunk, SearchHit, SearchResult
 from ..utils.logger import app_logger
 
+# Chunks sent per insert request, keeping each request under the gRPC message size limit
+INSERT_BATCH_SIZE = 1000
+
+# HNSW graph parameters: links per node and candidate list size while building
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+
+# Default candidate list size while searching; raise it for better recall
+HNSW_EF_SEARCH = 40
+
+# Clusters probed per search on collections created with an IVF_* index before the switch to HNSW
+IVF_NPROBE = 10
+
 
 class MilvusClient:
     """Milvus client for vector database operations."""
     
-    def __init__(self):
+    def __init__(self, alias: str = "default", collection_name: Optional[str] = None):
         self.logger = app_logger.bind(component="milvus_client")
+        self.alias = alias
         self.collection = None
+        self.index_type = None
         self.dimension = settings.milvus_dimension
-        self.collection_name = settings.milvus_collection_name
+        self.collection_name = collection_name or settings.milvus_collection_name
         
         self._connect()
         self._ensure_collection()
     
     def _connect(self):
-        """Connect to Milvus server."""
+        """Connect to Milvus server, reusing an open connection under the same alias."""
+        if connections.has_connection(self.alias):
+            self.logger.debug(f"Reusing Milvus connection '{self.alias}'")
+            return
+        
         try:
             connections.connect(
-                "default",
+                self.alias,
                 host=settings.milvus_host,
                 port=settings.milvus_port,
             )
@@ -42,15 +62,33 @@ class MilvusClient:
     def _ensure_collection(self):
         """Ensure collection exists with proper schema."""
         try:
-            if utility.has_collection(self.collection_name):
-                self.collection = Collection(self.collection_name)
-                self.logger.info(f"Using existing collection: {self.collection_name}")
+            if utility.has_collection(self.collection_name, using=self.alias):
+                self.collection = Collection(self.collection_name, using=self.alias)
+                self.index_type = self._read_index_type()
+                self.logger.info(
+                    f"Using existing collection: {self.collection_name} (index: {self.index_type})"
+                )
             else:
                 self._create_collection()
         except Exception as e:
             self.logger.error(f"Failed to ensure collection: {e}")
             raise
     
+    def _read_index_type(self) -> Optional[str]:
+        """Get the index type of the embedding field, or None if it has no index."""
+        for index in self.collection.indexes:
+            if index.field_name == "embedding":
+                return index.params.get("index_type")
+        return None
+    
+    def _search_params(self, ef_search: int, top_k: int) -> Dict[str, Any]:
+        """Get the search parameters that the embedding index understands."""
+        if self.index_type == "HNSW":
+            return {"ef": max(ef_search, top_k)}
+        if self.index_type and self.index_type.startswith("IVF"):
+            return {"nprobe": IVF_NPROBE}
+        return {}
+    
     def _create_collection(self):
         """Create collection with proper schema."""
         try:
@@ -68,48 +106,67 @@ class MilvusClient:
             ]
             
             schema = CollectionSchema(fields=fields)
-            self.collection = Collection(self.collection_name, schema)
+            self.collection = Collection(self.collection_name, schema, using=self.alias)
             
             # Create index
             index_params = {
                 "metric_type": "L2",
-                "index_type": "IVF_FLAT",
-                "params": {"nlist": 1024},
+                "index_type": "HNSW",
+                "params": {"M": HNSW_M, "efConstruction": HNSW_EF_CONSTRUCTION},
             }
             
             self.collection.create_index("embedding", index_params)
+            self.index_type = index_params["index_type"]
             self.logger.info(f"Created collection: {self.collection_name}")
             
         except Exception as e:
             self.logger.error(f"Failed to create collection: {e}")
             raise
     
-    def insert_chunks(self, chunks: List[CodeChunk]) -> int:
-        """Insert code chunks into Milvus."""
+    def insert_chunks(self, chunks: List[CodeChunk], batch_size: int = INSERT_BATCH_SIZE,
+                      flush: bool = True) -> int:
+        """Insert code chunks into Milvus, batch_size chunks per insert request.
+        
+        Pass flush=False to skip the blocking flush when the data is only read back with
+        strongly consistent searches or counts, which already see unflushed rows.
+        """
         if not chunks:
             return 0
         
+        # Reject bad vectors before serializing anything; np.shape is O(1) for the usual arrays
+        expected_shape = (self.dimension,)
+        mismatched = [chunk.id for chunk in chunks
+                      if chunk.embedding is None or np.shape(chunk.embedding) != expected_shape]
+        if mismatched:
+            raise ValueError(
+                f"Expected {self.dimension}-dimension embedding vectors, "
+                f"got missing or mismatched ones for {len(mismatched)} chunks: {mismatched[:5]}"
+            )
+        
         try:
             self.logger.info(f"Inserting {len(chunks)} chunks into Milvus")
             
-            # Prepare data for insertion
-            data = {
-                "id": [chunk.id for chunk in chunks],
-                "file_path": [chunk.file_path for chunk in chunks],
-                "content": [chunk.content for chunk in chunks],
-                "start_line": [chunk.start_line for chunk in chunks],
-                "end_line": [chunk.end_line for chunk in chunks],
-                "language": [chunk.language for chunk in chunks],
-                "chunk_type": [chunk.chunk_type for chunk in chunks],
-                "metadata": [chunk.metadata for chunk in chunks],
-                "embedding": [chunk.embedding for chunk in chunks],
-            }
-            
-            # Insert data
-            insert_result = self.collection.insert([data[field] for field in data.keys()])
+            for start in range(0, len(chunks), batch_size):
+                batch = chunks[start:start + batch_size]
+                
+                # Prepare data for insertion, one column per field
+                data = [
+                    [chunk.id for chunk in batch],
+                    [chunk.file_path for chunk in batch],
+                    [chunk.content for chunk in batch],
+                    [chunk.start_line for chunk in batch],
+                    [chunk.end_line for chunk in batch],
+                    [chunk.language for chunk in batch],
+                    [chunk.chunk_type for chunk in batch],
+                    [chunk.metadata for chunk in batch],
+                    [chunk.embedding for chunk in batch],
+                ]
+                
+                self.collection.insert(data)
             
             # Flush to ensure data is persisted
-            self.collection.flush()
+            if flush:
+                self.collection.flush()
             
             self.logger.info(f"Successfully inserted {len(chunks)} chunks")
             return len(chunks)
@@ -118,60 +175,89 @@ class MilvusClient:
             self.logger.error(f"Failed to insert chunks: {e}")
             raise
     
+    def _search(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        filter_expression: Optional[str],
+        metric_type: str,
+        consistency_level: Optional[str],
+        ef_search: int,
+        output_fields: List[str]
+    ):
+        """Run one vector search and return its hits."""
+        # Load collection into memory
+        self.collection.load()
+        
+        # Prepare search parameters
+        search_params = {
+            "metric_type": metric_type,
+            "params": self._search_params(ef_search, top_k),
+        }
+        
+        # Only override the collection's consistency level when asked to
+        extra_params = {}
+        if consistency_level:
+            extra_params["consistency_level"] = consistency_level
+        
+        results = self.collection.search(
+            data=[query_embedding],
+            anns_field="embedding",
+            param=search_params,
+            limit=top_k,
+            expr=filter_expression,
+            output_fields=output_fields,
+            **extra_params,
+        )
+        return results[0]
+    
     def search_similar(
         self,
         query_embedding: List[float],
         top_k: int = 10,
         filter_expression: Optional[str] = None,
-        metric_type: str = "L2"
+        metric_type: str = "L2",
+        consistency_level: Optional[str] = None,
+        ef_search: int = HNSW_EF_SEARCH
     ) -> List[SearchResult]:
-        """Search for similar chunks using vector similarity."""
+        """Search for similar chunks using vector similarity.
+        
+        consistency_level overrides the collection's default, e.g. "Strong" to see rows
+        inserted without a flush. ef_search trades speed for recall on HNSW indexes; Milvus
+        needs it to be at least top_k, so it is raised to top_k when smaller. Older IVF
+        collections are searched with IVF_NPROBE instead.
+        """
         try:
             self.logger.info(f"Searching for similar chunks with top_k={top_k}")
             
-            # Load collection into memory
-            self.collection.load()
-            
-            # Prepare search parameters
-            search_params = {
-                "metric_type": metric_type,
-                "params": {"nprobe": 10},
-            }
-            
-            # Perform search
-            results = self.collection.search(
-                data=[query_embedding],
-                anns_field="embedding",
-                param=search_params,
-                limit=top_k,
-                expr=filter_expression,
+            hits = self._search(
+                query_embedding, top_k, filter_expression, metric_type, consistency_level, ef_search,
                 output_fields=["id", "file_path", "content", "start_line", "end_line", 
-                             "language", "chunk_type", "metadata"],
+                               "language", "chunk_type", "metadata"],
             )
             
             # Convert results to SearchResult objects
             search_results = []
-            for hits in results:
-                for i, hit in enumerate(hits):
-                    chunk = CodeChunk(
-                        id=hit.id,
-                        file_path=hit.entity.get("file_path"),
-                        content=hit.entity.get("content"),
-                        start_line=hit.entity.get("start_line"),
-                        end_line=hit.entity.get("end_line"),
-                        language=hit.entity.get("language"),
-                        chunk_type=hit.entity.get("chunk_type"),
-                        metadata=hit.entity.get("metadata", {}),
-                    )
-                    
-                    search_result = SearchResult(
-                        chunk=chunk,
-                        score=hit.score,
-                        rank=i + 1,
-                        search_type="vector",
-                        metadata={"distance": hit.distance},
-                    )
-                    search_results.append(search_result)
+            for i, hit in enumerate(hits):
+                chunk = CodeChunk(
+                    id=hit.id,
+                    file_path=hit.entity.get("file_path"),
+                    content=hit.entity.get("content"),
+                    start_line=hit.entity.get("start_line"),
+                    end_line=hit.entity.get("end_line"),
+                    language=hit.entity.get("language"),
+                    chunk_type=hit.entity.get("chunk_type"),
+                    metadata=hit.entity.get("metadata", {}),
+                )
+                
+                search_result = SearchResult(
+                    chunk=chunk,
+                    score=hit.score,
+                    rank=i + 1,
+                    search_type="vector",
+                    metadata={"distance": hit.distance},
+                )
+                search_results.append(search_result)
             
             self.logger.info(f"Found {len(search_results)} similar chunks")
             return search_results
@@ -180,6 +266,32 @@ class MilvusClient:
             self.logger.error(f"Failed to search similar chunks: {e}")
             raise
     
+    def search_hits(
+        self,
+        query_embedding: List[float],
+        top_k: int = 10,
+        filter_expression: Optional[str] = None,
+        metric_type: str = "L2",
+        consistency_level: Optional[str] = None,
+        ef_search: int = HNSW_EF_SEARCH
+    ) -> List[SearchHit]:
+        """Search like search_similar, but return only chunk ids and scores.
+        
+        Callers that rank and cut candidates load just the survivors with get_chunks_by_ids.
+        """
+        try:
+            self.logger.info(f"Searching for similar chunk ids with top_k={top_k}")
+            
+            hits = self._search(
+                query_embedding, top_k, filter_expression, metric_type, consistency_level, ef_search,
+                output_fields=["id"],
+            )
+            return [SearchHit(id=hit.id, score=hit.score) for hit in hits]
+            
+        except Exception as e:
+            self.logger.error(f"Failed to search similar chunks: {e}")
+            raise
+    
     def delete_by_file_path(self, file_path: str) -> int:
         """Delete all chunks for a specific file."""
         try:
@@ -194,14 +306,20 @@ class MilvusClient:
             self.logger.error(f"Failed to delete chunks for file {file_path}: {e}")
             raise
     
-    def get_chunk_by_id(self, chunk_id: str) -> Optional[CodeChunk]:
-        """Get a specific chunk by ID."""
+    def get_chunk_by_id(self, chunk_id: str, consistency_level: Optional[str] = None) -> Optional[CodeChunk]:
+        """Get a specific chunk by ID; consistency_level works as in search_similar."""
         try:
+            # Only override the collection's consistency level when asked to
+            extra_params = {}
+            if consistency_level:
+                extra_params["consistency_level"] = consistency_level
+            
             expr = f'id == "{chunk_id}"'
             results = self.collection.query(
                 expr=expr,
                 output_fields=["id", "file_path", "content", "start_line", "end_line", 
                              "language", "chunk_type", "metadata", "embedding"],
+                **extra_params,
             )
             
             if results:
@@ -224,6 +342,36 @@ class MilvusClient:
             self.logger.error(f"Failed to get chunk {chunk_id}: {e}")
             return None
     
+    def get_chunks_by_ids(self, chunk_ids: List[str]) -> Dict[str, CodeChunk]:
+        """Get chunks by ID with one query; IDs that aren't found are left out, and errors are raised."""
+        if not chunk_ids:
+            return {}
+        
+        try:
+            results = self.collection.query(
+                expr=f"id in {json.dumps(list(chunk_ids))}",
+                output_fields=["id", "file_path", "content", "start_line", "end_line", 
+                             "language", "chunk_type", "metadata"],
+            )
+            
+            return {
+                result["id"]: CodeChunk(
+                    id=result["id"],
+                    file_path=result["file_path"],
+                    content=result["content"],
+                    start_line=result["start_line"],
+                    end_line=result["end_line"],
+                    language=result["language"],
+                    chunk_type=result["chunk_type"],
+                    metadata=result["metadata"],
+                )
+                for result in results
+            }
+            
+        except Exception as e:
+            self.logger.error(f"Failed to get {len(chunk_ids)} chunks by id: {e}")
+            raise
+    
     def get_chunks_by_file(self, file_path: str) -> List[CodeChunk]:
         """Get all chunks for a specific file."""
         try:
@@ -258,13 +406,28 @@ class MilvusClient:
     def drop_collection(self):
         """Drop the entire collection."""
         try:
-            if utility.has_collection(self.collection_name):
-                utility.drop_collection(self.collection_name)
+            if utility.has_collection(self.collection_name, using=self.alias):
+                utility.drop_collection(self.collection_name, using=self.alias)
                 self.logger.info(f"Dropped collection: {self.collection_name}")
         except Exception as e:
             self.logger.error(f"Failed to drop collection: {e}")
             raise
     
+    def get_entity_count(self, consistency_level: str = "Strong") -> int:
+        """Count the entities in the collection, including rows that haven't been flushed yet."""
+        try:
+            self.collection.load()
+            result = self.collection.query(
+                expr="",
+                output_fields=["count(*)"],
+                consistency_level=consistency_level,
+            )
+            return result[0]["count(*)"] if result else 0
+            
+        except Exception as e:
+            self.logger.error(f"Failed to count entities: {e}")
+            raise
+    
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get collection statistics."""
         try:
@@ -285,7 +448,7 @@ class MilvusClient:
     def close(self):
         """Close connection to Milvus."""
         try:
-            connections.disconnect("default")
+            connections.disconnect(self.alias)
             self.logger.info("Disconnected from Milvus")
         except Exception as e:
             self.logger.error(f"Failed to disconnect from Milvus: {e}")
\ No newline at end of file
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from typing import List, Set, Optional, Iterator
+from typing import List, Set, Optional, Iterable, Iterator
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
@@ -36,6 +36,10 @@ class LocalCodebaseScanner:
         self.logger.info(f"Found {len(all_files)} files to process")
         return all_files
     
+    def iter_scan(self) -> Iterator[CodeFile]:
+        """Yield code files as the directory walk finds them, without collecting a list."""
+        return self._walk_directory()
+    
     def _walk_directory(self) -> Iterator[CodeFile]:
         """Walk through directory and yield code files."""
         try:
@@ -173,17 +177,36 @@ class LocalCodebaseScanner:
                 file.content = content
             return file
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [executor.submit(load_content, file) for file in code_files]
-            
-            for future in as_completed(futures):
+        if len(code_files) <= max_workers:
+            # Too few files to overlap their reads; skip starting a thread pool
+            for file in code_files:
                 try:
-                    future.result()
+                    load_content(file)
                 except Exception as e:
                     self.logger.error(f"Error loading file content: {e}")
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(load_content, file) for file in code_files]
+                
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except Exception as e:
+                        self.logger.error(f"Error loading file content: {e}")
         
         # Filter out files that couldn't be loaded
         loaded_files = [f for f in code_files if f.content is not None]
         self.logger.info(f"Successfully loaded content for {len(loaded_files)} files")
         
-        return loaded_files
\ No newline at end of file
+        return loaded_files
+    
+    def iter_load(self, code_files: Iterable[CodeFile]) -> Iterator[CodeFile]:
+        """Load and yield files one at a time, so only the file being processed is held in memory.
+        
+        Files whose content can't be loaded are skipped, as in load_files_content.
+        """
+        for code_file in code_files:
+            content = self.load_file_content(code_file)
+            if content:
+                code_file.content = content
+                yield code_file
@@ -1,25 +1,41 @@
 from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import os
 import re
-import math
-from rank_bm25 import BM25Okapi
+import json
+from pathlib import Path
 import numpy as np
-from collections import Counter
 
 from ..config import settings
-from ..types import SearchResult, CodeChunk
+from ..types import SearchHit, SearchResult, CodeChunk
 from ..utils.logger import app_logger
 
 
 class BM25Search:
-    """BM25 search implementation for keyword-based retrieval."""
+    """BM25 search implementation for keyword-based retrieval.
     
-    def __init__(self, k1: float = 1.2, b: float = 0.75):
+    BM25 term scores are computed eagerly at index time and stored as a
+    token-major CSR matrix (``data``, ``indices``, ``indptr``), so a query
+    only sums the rows of its tokens. Scores are quantized to int16 with a
+    single ``scale`` factor to halve the bytes read per query.
+    """
+    
+    # Index arrays persisted by save() and memory-mapped by load()
+    _ARRAYS = ("data", "indices", "indptr", "doc_len", "doc_freqs")
+    
+    def __init__(self, k1: float = 1.2, b: float = 0.75, epsilon: float = 0.25):
         self.logger = app_logger.bind(component="bm25_search")
         self.k1 = k1 or settings.bm25_k1
         self.b = b or settings.bm25_b
-        self.corpus = []
-        self.bm25 = None
-        self.chunk_metadata = []
+        self.epsilon = epsilon
+        self.token_to_id: Dict[str, int] = {}
+        self.chunk_ids: List[str] = []
+        self.doc_len: Optional[np.ndarray] = None
+        self.doc_freqs: Optional[np.ndarray] = None
+        self.data: Optional[np.ndarray] = None
+        self.scale = 1.0
+        self.indices: Optional[np.ndarray] = None
+        self.indptr: Optional[np.ndarray] = None
     
     def index_chunks(self, chunks: List[CodeChunk]):
         """Index chunks for BM25 search."""
@@ -28,27 +44,66 @@ class BM25Search:
         
         self.logger.info(f"Indexing {len(chunks)} chunks for BM25 search")
         
-        # Preprocess text
-        self.corpus = []
-        self.chunk_metadata = []
+        self.token_to_id = {}
+        self.chunk_ids = [chunk.id for chunk in chunks]
+        token_ids = []
+        num_docs = len(chunks)
+        doc_len = np.zeros(num_docs, dtype=np.int32)
         
-        for chunk in chunks:
+        for doc_id, chunk in enumerate(chunks):
             # Preprocess text: lowercase, tokenize
             tokens = self._preprocess_text(chunk.content)
-            self.corpus.append(tokens)
-            self.chunk_metadata.append({
-                "chunk_id": chunk.id,
-                "file_path": chunk.file_path,
-                "language": chunk.language,
-                "chunk_type": chunk.chunk_type,
-                "start_line": chunk.start_line,
-                "end_line": chunk.end_line,
-            })
+            doc_len[doc_id] = len(tokens)
+            token_ids.extend(
+                self.token_to_id.setdefault(token, len(self.token_to_id)) for token in tokens
+            )
+        
+        # Collapse repeated tokens into token-major (token, doc, tf) triplets
+        doc_ids = np.repeat(np.arange(num_docs, dtype=np.int64), doc_len)
+        keys, term_freqs = np.unique(
+            np.asarray(token_ids, dtype=np.int64) * num_docs + doc_ids, return_counts=True
+        )
         
         # Create BM25 index
-        self.bm25 = BM25Okapi(self.corpus, k1=self.k1, b=self.b)
+        self._build_score_matrix(
+            (keys // num_docs).astype(np.int32),
+            (keys % num_docs).astype(np.int32),
+            term_freqs.astype(np.float64),
+            doc_len,
+        )
         self.logger.info("BM25 index created successfully")
     
+    def _build_score_matrix(self, token_ids: np.ndarray, doc_ids: np.ndarray,
+                            term_freqs: np.ndarray, doc_len: np.ndarray):
+        """Precompute BM25 scores for token-major sorted (token, doc, tf) triplets as CSR."""
+        vocab_size = len(self.token_to_id)
+        self.doc_len = doc_len
+        self.doc_freqs = np.bincount(token_ids, minlength=vocab_size).astype(np.int32)
+        self.indptr = np.zeros(vocab_size + 1, dtype=np.int64)
+        np.cumsum(self.doc_freqs, out=self.indptr[1:])
+        
+        if vocab_size == 0:
+            self.data = np.zeros(0, dtype=np.int16)
+            self.indices = np.zeros(0, dtype=np.int32)
+            self.scale = 1.0
+            return
+        
+        # Okapi idf with a floor of epsilon * average idf for very common tokens
+        num_docs = len(doc_len)
+        idf = np.log(num_docs - self.doc_freqs + 0.5) - np.log(self.doc_freqs + 0.5)
+        idf[idf < 0] = self.epsilon * idf.mean()
+        
+        length_norm = self.k1 * (1 - self.b + self.b * doc_len / doc_len.mean())
+        scores = idf[token_ids] * (term_freqs * (self.k1 + 1) /
+                                   (term_freqs + length_norm[doc_ids]))
+        
+        # Quantize to int16; the scale is applied once per query, not per entry
+        max_abs = float(np.abs(scores).max())
+        self.scale = max_abs / 32767.0 if max_abs > 0 else 1.0
+        
+        self.data = np.round(scores / self.scale).astype(np.int16)
+        self.indices = doc_ids
+    
     def _preprocess_text(self, text: str) -> List[str]:
         """Preprocess text for BM25."""
         # Convert to lowercase
@@ -65,86 +120,168 @@ class BM25Search:
         
         return tokens
     
-    def search(self, query: str, top_k: int = 10) -> List[SearchResult]:
-        """Search using BM25."""
-        if not self.bm25:
+    def get_scores(self, query_tokens: List[str]) -> np.ndarray:
+        """Get BM25 scores of every indexed document for the query tokens."""
+        scores = np.zeros(len(self.chunk_ids), dtype=np.int32)
+        for token in query_tokens:
+            token_id = self.token_to_id.get(token)
+            if token_id is None:
+                continue
+            start, end = self.indptr[token_id], self.indptr[token_id + 1]
+            scores[self.indices[start:end]] += self.data[start:end]
+        return scores * self.scale
+    
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """Search using BM25, returning (chunk_id, score) pairs."""
+        if self.indptr is None:
             return []
         
         # Preprocess query
         query_tokens = self._preprocess_text(query)
         
         # Get BM25 scores
-        bm25_scores = self.bm25.get_scores(query_tokens)
+        bm25_scores = self.get_scores(query_tokens)
         
-        # Get top-k results
-        top_indices = np.argsort(bm25_scores)[::-1][:top_k]
+        # Get top-k results: partial selection, then sort only the k survivors
+        top_k = min(top_k, len(bm25_scores))
+        if top_k <= 0:
+            return []
+        if top_k < len(bm25_scores):
+            top_indices = np.argpartition(-bm25_scores, top_k - 1)[:top_k]
+        else:
+            top_indices = np.arange(len(bm25_scores))
+        top_indices = top_indices[np.argsort(-bm25_scores[top_indices], kind="stable")]
         
         results = []
-        for rank, idx in enumerate(top_indices):
-            if bm25_scores[idx] > 0:  # Only include results with positive scores
-                result = SearchResult(
-                    chunk=CodeChunk(
-                        id=self.chunk_metadata[idx]["chunk_id"],
-                        file_path=self.chunk_metadata[idx]["file_path"],
-                        content="",  # Will be filled by the caller
-                        start_line=self.chunk_metadata[idx]["start_line"],
-                        end_line=self.chunk_metadata[idx]["end_line"],
-                        language=self.chunk_metadata[idx]["language"],
-                        chunk_type=self.chunk_metadata[idx]["chunk_type"],
-                        metadata={},
-                    ),
-                    score=float(bm25_scores[idx]),
-                    rank=rank + 1,
-                    search_type="bm25",
-                    metadata={"bm25_score": float(bm25_scores[idx])},
-                )
-                results.append(result)
+        for idx, score in zip(top_indices.tolist(), bm25_scores[top_indices].tolist()):
+            # Scores are sorted, so stop at the first non-positive one
+            if score <= 0:
+                break
+            results.append((self.chunk_ids[idx], score))
         
         return results
     
+    def save(self, path: str):
+        """Persist the BM25 index to a directory."""
+        if self.indptr is None:
+            raise ValueError("BM25 index is empty, nothing to save")
+        
+        index_dir = Path(path)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        
+        # One .npy per array: members of an .npz archive cannot be memory-mapped.
+        # Files are swapped in with os.replace so arrays memory-mapped from a
+        # previous save stay valid instead of being truncated underneath a reader.
+        for name in self._ARRAYS:
+            tmp_path = index_dir / f"{name}.npy.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, getattr(self, name))
+            os.replace(tmp_path, index_dir / f"{name}.npy")
+        
+        tmp_path = index_dir / "vocabulary.json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "epsilon": self.epsilon,
+                "scale": self.scale,
+                "token_to_id": self.token_to_id,
+                "chunk_ids": self.chunk_ids,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, index_dir / "vocabulary.json")
+        
+        self.logger.info(f"Saved BM25 index with {len(self.chunk_ids)} documents to {index_dir}")
+    
+    def load(self, path: str):
+        """Load a BM25 index saved with save(), memory-mapping the score matrix."""
+        index_dir = Path(path)
+        
+        with open(index_dir / "vocabulary.json", "r", encoding="utf-8") as f:
+            vocabulary = json.load(f)
+        
+        self.k1 = vocabulary["k1"]
+        self.b = vocabulary["b"]
+        self.epsilon = vocabulary["epsilon"]
+        self.scale = vocabulary["scale"]
+        self.token_to_id = vocabulary["token_to_id"]
+        self.chunk_ids = vocabulary["chunk_ids"]
+        
+        # Pages fault in on demand; a query only touches the rows of its tokens
+        for name in self._ARRAYS:
+            setattr(self, name, np.load(index_dir / f"{name}.npy", mmap_mode="r"))
+        
+        self.logger.info(f"Loaded BM25 index with {len(self.chunk_ids)} documents from {index_dir}")
+    
     def get_document_frequency(self, token: str) -> int:
         """Get document frequency for a token."""
-        if not self.bm25:
+        token_id = self.token_to_id.get(token)
+        if token_id is None:
             return 0
         
-        token_count = 0
-        for doc in self.corpus:
-            if token in doc:
-                token_count += 1
-        
-        return token_count
+        return int(self.doc_freqs[token_id])
     
     def get_vocabulary_size(self) -> int:
         """Get vocabulary size."""
-        if not self.corpus:
-            return 0
-        
-        vocabulary = set()
-        for doc in self.corpus:
-            vocabulary.update(doc)
-        
-        return len(vocabulary)
+        return len(self.token_to_id)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get BM25 statistics."""
         return {
-            "indexed_documents": len(self.corpus),
+            "indexed_documents": len(self.chunk_ids),
             "vocabulary_size": self.get_vocabulary_size(),
             "k1": self.k1,
             "b": self.b,
         }
 
 
+def _normalize_scores(scores: List[float]) -> List[float]:
+    """Min-max normalize scores to [0, 1]."""
+    if not scores:
+        return []
+    min_score = min(scores)
+    max_score = max(scores)
+    if max_score == min_score:
+        return [0.5] * len(scores)
+    return [(s - min_score) / (max_score - min_score) for s in scores]
+
+
 class HybridSearch:
     """Hybrid search combining vector similarity and BM25."""
     
-    def __init__(self, milvus_client, graph_client, embedding_service):
+    def __init__(self, milvus_client, graph_client, embedding_service,
+                 bm25_index_path: Optional[str] = None):
         self.logger = app_logger.bind(component="hybrid_search")
         self.milvus_client = milvus_client
         self.graph_client = graph_client
         self.embedding_service = embedding_service
         self.bm25_search = BM25Search()
         self.chunk_cache = {}  # Cache for chunk data
+        self.bm25_index_path = bm25_index_path or settings.bm25_index_path
+        self._load_bm25_index()
+    
+    def _load_bm25_index(self):
+        """Load the persisted BM25 index, if there is one.
+        
+        Only chunk ids are persisted; chunks are fetched from Milvus when a hit is not cached.
+        """
+        if not self.bm25_index_path or not (Path(self.bm25_index_path) / "vocabulary.json").exists():
+            return
+        
+        try:
+            self.bm25_search.load(self.bm25_index_path)
+        except (OSError, ValueError, KeyError) as e:
+            self.logger.warning(f"Could not load BM25 index from {self.bm25_index_path}, starting empty: {e}")
+            self.bm25_search = BM25Search()
+    
+    def _save_bm25_index(self):
+        """Persist the BM25 index when an index path is configured."""
+        if not self.bm25_index_path:
+            return
+        
+        try:
+            self.bm25_search.save(self.bm25_index_path)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not save BM25 index to {self.bm25_index_path}: {e}")
     
     async def index_chunks(self, chunks: List[CodeChunk]):
         """Index chunks for hybrid search."""
@@ -156,11 +293,14 @@ class HybridSearch:
         # Generate embeddings
         chunks_with_embeddings = await self.embedding_service.embed_chunks(chunks)
         
-        # Insert into Milvus
-        self.milvus_client.insert_chunks(chunks_with_embeddings)
+        # Insert into Milvus, off the event loop since the client is blocking
+        await asyncio.get_event_loop().run_in_executor(
+            None, self.milvus_client.insert_chunks, chunks_with_embeddings
+        )
         
         # Index for BM25
         self.bm25_search.index_chunks(chunks)
+        self._save_bm25_index()
         
         # Create graph nodes and relationships in JSON graph
         await self._create_graph_data(chunks)
@@ -178,15 +318,16 @@ class HybridSearch:
         """Perform hybrid search."""
         self.logger.info(f"Performing hybrid search for query: {query}")
         
-        # Get vector search results
-        vector_results = await self._vector_search(query, top_k)
-        
-        # Get BM25 search results
-        bm25_results = self._bm25_search(query, top_k)
+        # Get vector search hits and BM25 results together, scoring BM25 in the executor
+        # while the query embedding request is in flight
+        vector_hits, bm25_results = await asyncio.gather(
+            self._vector_search(query, top_k),
+            asyncio.get_event_loop().run_in_executor(None, self._bm25_search, query, top_k),
+        )
         
         # Combine results
-        combined_results = self._combine_results(
-            vector_results, bm25_results, 
+        combined_results = await self._combine_results(
+            vector_hits, bm25_results, 
             vector_weight, bm25_weight, top_k
         )
         
@@ -196,18 +337,18 @@ class HybridSearch:
         
         return combined_results
     
-    async def _vector_search(self, query: str, top_k: int) -> List[SearchResult]:
-        """Perform vector search."""
+    async def _vector_search(self, query: str, top_k: int) -> List[SearchHit]:
+        """Perform vector search, returning chunk ids and scores only."""
         try:
             # Generate query embedding
             query_embedding = await self.embedding_service.embed_query(query)
             
-            # Search in Milvus
-            vector_results = self.milvus_client.search_similar(
-                query_embedding, top_k
+            # Search in Milvus off the event loop; chunks are loaded once the final top-k is known
+            vector_hits = await asyncio.get_event_loop().run_in_executor(
+                None, self.milvus_client.search_hits, query_embedding, top_k
             )
             
-            return vector_results
+            return vector_hits
             
         except Exception as e:
             self.logger.error(f"Error in vector search: {e}")
@@ -216,14 +357,26 @@ class HybridSearch:
     def _bm25_search(self, query: str, top_k: int) -> List[SearchResult]:
         """Perform BM25 search."""
         try:
-            bm25_results = self.bm25_search.search(query, top_k)
+            bm25_results = []
+            bm25_hits = self.bm25_search.search(query, top_k)
+            
+            # A loaded index only knows chunk ids; fetch uncached chunks from Milvus
+            # (this runs in the executor) and skip ids Milvus does not know either
+            missing = [chunk_id for chunk_id, _ in bm25_hits if chunk_id not in self.chunk_cache]
+            if missing:
+                self.chunk_cache.update(self.milvus_client.get_chunks_by_ids(missing))
             
-            # Fill in chunk content from cache
-            for result in bm25_results:
-                if result.chunk.id in self.chunk_cache:
-                    cached_chunk = self.chunk_cache[result.chunk.id]
-                    result.chunk.content = cached_chunk.content
-                    result.chunk.metadata = cached_chunk.metadata
+            for chunk_id, score in bm25_hits:
+                chunk = self.chunk_cache.get(chunk_id)
+                if chunk is None:
+                    continue
+                bm25_results.append(SearchResult(
+                    chunk=chunk,
+                    score=score,
+                    rank=len(bm25_results) + 1,
+                    search_type="bm25",
+                    metadata={"bm25_score": score},
+                ))
             
             return bm25_results
             
@@ -231,55 +384,64 @@ class HybridSearch:
             self.logger.error(f"Error in BM25 search: {e}")
             return []
     
-    def _combine_results(self, vector_results: List[SearchResult], 
+    async def _combine_results(self, vector_hits: List[SearchHit], 
                          bm25_results: List[SearchResult],
                          vector_weight: float, bm25_weight: float,
                          top_k: int) -> List[SearchResult]:
-        """Combine vector and BM25 results."""
-        # Normalize scores
-        vector_scores = [r.score for r in vector_results]
-        bm25_scores = [r.score for r in bm25_results]
+        """Combine vector and BM25 results.
         
-        # Min-max normalization
-        def normalize_scores(scores):
-            if not scores:
-                return []
-            min_score = min(scores)
-            max_score = max(scores)
-            if max_score == min_score:
-                return [0.5] * len(scores)
-            return [(s - min_score) / (max_score - min_score) for s in scores]
+        Like a failed vector search, a failed chunk lookup in Milvus is logged and the
+        BM25 results are returned on their own.
+        """
+        # BM25 results already carry their chunks; vector hits are loaded after ranking
+        known_chunks = {result.chunk.id: result.chunk for result in bm25_results}
+        bm25_hits = [SearchHit(id=result.chunk.id, score=result.score) for result in bm25_results]
         
-        vector_norm = normalize_scores(vector_scores)
-        bm25_norm = normalize_scores(bm25_scores)
+        try:
+            return await self._merge_results(
+                vector_hits, bm25_hits, vector_weight, bm25_weight, top_k, known_chunks
+            )
+        except Exception as e:
+            self.logger.error(f"Error loading ranked chunks, falling back to BM25 results: {e}")
+            return await self._scale_and_wrap(bm25_hits, "bm25", bm25_weight, top_k, known_chunks)
+    
+    async def _merge_results(self, vector_hits: List[SearchHit], bm25_hits: List[SearchHit],
+                             vector_weight: float, bm25_weight: float, top_k: int,
+                             known_chunks: Dict[str, CodeChunk]) -> List[SearchResult]:
+        """Merge vector and BM25 hits by weighted normalized score, loading the top-k chunks."""
+        # Fast paths: with a single source there is nothing to merge
+        if not vector_hits:
+            return await self._scale_and_wrap(bm25_hits, "bm25", bm25_weight, top_k, known_chunks)
+        if not bm25_hits:
+            return await self._scale_and_wrap(vector_hits, "vector", vector_weight, top_k, known_chunks)
+        
+        # Min-max normalization
+        vector_norm = _normalize_scores([hit.score for hit in vector_hits])
+        bm25_norm = _normalize_scores([hit.score for hit in bm25_hits])
         
         # Create combined results dictionary
         combined_dict = {}
         
         # Add vector results
-        for i, result in enumerate(vector_results):
-            chunk_id = result.chunk.id
-            if chunk_id not in combined_dict:
-                combined_dict[chunk_id] = {
-                    "chunk": result.chunk,
-                    "vector_score": vector_norm[i] if i < len(vector_norm) else 0,
+        for i, hit in enumerate(vector_hits):
+            if hit.id not in combined_dict:
+                combined_dict[hit.id] = {
+                    "vector_score": vector_norm[i],
                     "bm25_score": 0,
                     "search_types": ["vector"],
                 }
         
         # Add BM25 results
-        for i, result in enumerate(bm25_results):
-            chunk_id = result.chunk.id
-            if chunk_id not in combined_dict:
-                combined_dict[chunk_id] = {
-                    "chunk": result.chunk,
+        for i, hit in enumerate(bm25_hits):
+            if hit.id not in combined_dict:
+                combined_dict[hit.id] = {
                     "vector_score": 0,
-                    "bm25_score": bm25_norm[i] if i < len(bm25_norm) else 0,
+                    "bm25_score": bm25_norm[i],
                     "search_types": ["bm25"],
                 }
             else:
-                combined_dict[chunk_id]["bm25_score"] = bm25_norm[i] if i < len(bm25_norm) else 0
-                combined_dict[chunk_id]["search_types"].append("bm25")
+                combined_dict[hit.id]["bm25_score"] = bm25_norm[i]
+                combined_dict[hit.id]["search_types"].append("bm25")
         
         # Calculate combined scores
         for chunk_id, data in combined_dict.items():
@@ -289,19 +451,28 @@ class HybridSearch:
             )
             data["combined_score"] = combined_score
         
-        # Sort by combined score and return top-k
-        sorted_results = sorted(
-            combined_dict.items(),
-            key=lambda x: x[1]["combined_score"],
-            reverse=True
-        )
+        # Sort by combined score and return top-k; a single best result only needs the argmax
+        if top_k == 1:
+            sorted_results = [max(combined_dict.items(), key=lambda x: x[1]["combined_score"])]
+        else:
+            sorted_results = sorted(
+                combined_dict.items(),
+                key=lambda x: x[1]["combined_score"],
+                reverse=True
+            )
+        sorted_results = sorted_results[:top_k]
+        
+        # Load chunks for the survivors only
+        chunks = await self._load_chunks([chunk_id for chunk_id, _ in sorted_results], known_chunks)
         
         final_results = []
-        for rank, (chunk_id, data) in enumerate(sorted_results[:top_k]):
+        for chunk_id, data in sorted_results:
+            if chunk_id not in chunks:
+                continue
             result = SearchResult(
-                chunk=data["chunk"],
+                chunk=chunks[chunk_id],
                 score=data["combined_score"],
-                rank=rank + 1,
+                rank=len(final_results) + 1,
                 search_type="hybrid",
                 metadata={
                     "vector_score": data["vector_score"],
@@ -313,6 +484,71 @@ class HybridSearch:
         
         return final_results
     
+    async def _scale_and_wrap(self, hits: List[SearchHit], search_type: str,
+                        weight: float, top_k: int,
+                        known_chunks: Dict[str, CodeChunk]) -> List[SearchResult]:
+        """Wrap results from a single search type as hybrid results."""
+        if not hits or top_k <= 0:
+            return []
+        
+        normalized = _normalize_scores([hit.score for hit in hits])
+        scored = [(norm * weight, norm, hit) for norm, hit in zip(normalized, hits)]
+        
+        if top_k == 1:
+            scored = [max(scored, key=lambda x: x[0])]
+        else:
+            scored.sort(key=lambda x: x[0], reverse=True)
+        scored = scored[:top_k]
+        
+        # Load chunks for the survivors only
+        chunks = await self._load_chunks([hit.id for _, _, hit in scored], known_chunks)
+        
+        final_results = []
+        for combined_score, norm, hit in scored:
+            if hit.id not in chunks:
+                continue
+            final_results.append(SearchResult(
+                chunk=chunks[hit.id],
+                score=combined_score,
+                rank=len(final_results) + 1,
+                search_type="hybrid",
+                metadata={
+                    "vector_score": norm if search_type == "vector" else 0,
+                    "bm25_score": norm if search_type == "bm25" else 0,
+                    "search_types": [search_type],
+                },
+            ))
+        
+        return final_results
+    
+    async def _load_chunks(self, chunk_ids: List[str],
+                           known_chunks: Dict[str, CodeChunk]) -> Dict[str, CodeChunk]:
+        """Resolve chunk ids from known chunks and the chunk cache, then Milvus for the rest.
+        
+        Milvus errors propagate to the caller; ids Milvus doesn't know are logged and left out.
+        """
+        chunks = {}
+        missing = []
+        for chunk_id in chunk_ids:
+            chunk = known_chunks.get(chunk_id) or self.chunk_cache.get(chunk_id)
+            if chunk is None:
+                missing.append(chunk_id)
+            else:
+                chunks[chunk_id] = chunk
+        
+        if missing:
+            # Off the event loop, like the other Milvus calls
+            loaded = await asyncio.get_event_loop().run_in_executor(
+                None, self.milvus_client.get_chunks_by_ids, missing
+            )
+            chunks.update(loaded)
+            
+            dropped = [chunk_id for chunk_id in missing if chunk_id not in loaded]
+            if dropped:
+                self.logger.warning(f"Dropping {len(dropped)} search hits not found in Milvus: {dropped}")
+        
+        return chunks
+    
     async def _enhance_with_graph(self, results: List[SearchResult]) -> List[SearchResult]:
         """Enhance search results with graph information."""
         try:
@@ -324,22 +560,22 @@ class HybridSearch:
                     max_hops=2
                 )
                 
-                # Add graph context to metadata
-                result.metadata["graph_context"] = {
+                graph_context = {
                     "related_nodes": len(graph_result.nodes),
                     "related_edges": len(graph_result.edges),
                 }
                 
                 # If there are related functions, add them to context
                 related_functions = [
-                    node for node in graph_result.nodes 
+                    {"name": node.id, "file_path": node.file_path}
+                    for node in graph_result.nodes
                     if node.type == "Function"
                 ]
                 if related_functions:
-                    result.metadata["graph_context"]["related_functions"] = [
-                        {"name": node.id, "file_path": node.file_path}
-                        for node in related_functions
-                    ]
+                    graph_context["related_functions"] = related_functions
+                
+                # Add graph context to metadata
+                result.metadata["graph_context"] = graph_context
             
             return results
             
@@ -409,47 +645,48 @@ class HybridSearch:
             created_nodes = 0
             created_relationships = 0  # Add missing variable initialization
             
-            # Process each file
-            for file_path, file_data in files_dict.items():
-                try:
-                    # Extract file size from metadata
-                    metadata = file_data['metadata'] or {}
-                    file_size = metadata.get('file_size', 0)
-                    
-                    # Create file node with flattened metadata
-                    file_node = self.graph_client.create_file_node(
-                        file_path=file_path,
-                        language=file_data['language'] or 'unknown',
-                        file_type=self._determine_file_type(file_path),
-                        metadata={'file_size': file_size}  # Only pass primitive types
-                    )
-                    created_nodes += 1
-                    self.logger.debug(f"Created file node: {file_path}")
-                    
-                    # Create chunk nodes and relationships
-                    for chunk in file_data['chunks']:
-                        try:
-                            # Create chunk node
-                            chunk_node = self.graph_client.create_chunk_node(chunk)
-                            created_nodes += 1
-                            
-                            # Create file-chunk relationship
-                            file_chunk_rel = self.graph_client.create_file_chunk_relationship(
-                                file_path, chunk.id
-                            )
-                            created_relationships += 1
-                            
-                            # Extract and create function/class nodes if available
-                            await self._extract_and_create_code_entities(chunk)
-                            
-                        except Exception as e:
-                            self.logger.warning(f"Failed to create chunk node {chunk.id}: {e}")
-                            continue
-                            
-                except Exception as e:
-                    self.logger.warning(f"Failed to create file node {file_path}: {e}")
-                    continue
-            
+            # Process each file, saving the JSON graph once at the end instead of per write
+            with self.graph_client.bulk():
+                for file_path, file_data in files_dict.items():
+                    try:
+                        # Extract file size from metadata
+                        metadata = file_data['metadata'] or {}
+                        file_size = metadata.get('file_size', 0)
+                        
+                        # Create file node with flattened metadata
+                        file_node = self.graph_client.create_file_node(
+                            file_path=file_path,
+                            language=file_data['language'] or 'unknown',
+                            file_type=self._determine_file_type(file_path),
+                            metadata={'file_size': file_size}  # Only pass primitive types
+                        )
+                        created_nodes += 1
+                        self.logger.debug(f"Created file node: {file_path}")
+                        
+                        # Create chunk nodes and relationships
+                        for chunk in file_data['chunks']:
+                            try:
+                                # Create chunk node
+                                chunk_node = self.graph_client.create_chunk_node(chunk)
+                                created_nodes += 1
+                                
+                                # Create file-chunk relationship
+                                file_chunk_rel = self.graph_client.create_file_chunk_relationship(
+                                    file_path, chunk.id
+                                )
+                                created_relationships += 1
+                                
+                                # Extract and create function/class nodes if available
+                                await self._extract_and_create_code_entities(chunk)
+                                
+                            except Exception as e:
+                                self.logger.warning(f"Failed to create chunk node {chunk.id}: {e}")
+                                continue
+                                
+                    except Exception as e:
+                        self.logger.warning(f"Failed to create file node {file_path}: {e}")
+                        continue
+                
             self.logger.info(f"Graph data creation completed: {created_nodes} nodes, {created_relationships} relationships")
             
         except Exception as e:
@@ -457,7 +694,6 @@ class HybridSearch:
     
     def _determine_file_type(self, file_path: str) -> str:
         """Determine file type from file path."""
-        from pathlib import Path
         suffix = Path(file_path).suffix.lower()
         
         type_mapping = {
@@ -1,12 +1,108 @@
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterable
 import numpy as np
-from collections import defaultdict
+from dataclasses import dataclass, field
+from itertools import chain
+import asyncio
+import heapq
 import re
+from types import MappingProxyType
 
 from ..config import settings
-from ..types import SearchResult, CodeChunk, GraphResult
+from ..types import SearchResult, CodeChunk, GraphResult, GraphNode
 from ..utils.logger import app_logger
 
+# Control-flow keywords counted towards code complexity
+CONTROL_KEYWORD_RE = re.compile(r'\b(?:if|else|elif|for|while|try|except|catch|switch)\b')
+
+# Leading indentation of non-blank lines
+INDENTATION_RE = re.compile(r'^[^\S\n]+(?=\S)', re.MULTILINE)
+
+# Lines with any non-whitespace character
+NON_BLANK_LINE_RE = re.compile(r'^[^\S\n]*\S', re.MULTILINE)
+
+# Comment lines, or lines opening/closing a docstring (at most one match per line)
+DOCUMENTATION_LINE_RE = re.compile(r'^(?:[^\S\n]*(?:#|//|/\*)|.*?(?:"""|\'\'\'))', re.MULTILINE)
+
+# Graph feature weights (can be tuned), read-only so they can be shared
+FEATURE_WEIGHTS = MappingProxyType({
+    "degree_centrality": 0.2,
+    "query_function_matches": 0.3,
+    "query_class_matches": 0.3,
+    "function_depth": 0.1,
+    "class_hierarchy_depth": 0.1,
+    "call_frequency": 0.2,
+    "inheritance_importance": 0.2,
+    "code_complexity": 0.1,
+    "documentation_score": 0.1,
+})
+FEATURE_KEYS = tuple(FEATURE_WEIGHTS)
+FEATURE_INDEX = {key: i for i, key in enumerate(FEATURE_KEYS)}
+FEATURE_WEIGHT_VECTOR = np.array([FEATURE_WEIGHTS[key] for key in FEATURE_KEYS], dtype=np.float64)
+FEATURE_WEIGHT_SUM = float(FEATURE_WEIGHT_VECTOR.sum())
+
+# Substrings marking a query as keyword-oriented or semantic
+KEYWORD_QUERY_INDICATORS = ('function', 'class', 'method', 'variable', 'import', 'def', 'class')
+SEMANTIC_QUERY_INDICATORS = ('how to', 'what is', 'explain', 'implement', 'algorithm', 'pattern')
+
+
+@dataclass
+class GraphIndex:
+    """Adjacency and type indices built once per graph result."""
+    out_edges_by_type: Dict[str, Dict[str, List[str]]] = field(default_factory=dict)
+    in_edges_by_type: Dict[str, Dict[str, List[str]]] = field(default_factory=dict)
+    nodes_by_type: Dict[str, List[GraphNode]] = field(default_factory=dict)
+    node_positions: Dict[str, int] = field(default_factory=dict)
+    degrees: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.intp))
+    
+    @classmethod
+    def from_graph_result(cls, graph_result: GraphResult) -> "GraphIndex":
+        """Index the nodes and edges of a graph result in a single pass."""
+        out_edges = {}
+        in_edges = {}
+        nodes_by_type = {}
+        node_positions = {}
+        
+        for node in graph_result.nodes:
+            nodes_by_type.setdefault(node.type, []).append(node)
+            node_positions.setdefault(node.id, len(node_positions))
+        
+        for edge in graph_result.edges:
+            rel = edge.relationship_type
+            out_edges.setdefault(rel, {}).setdefault(edge.source_id, []).append(edge.target_id)
+            in_edges.setdefault(rel, {}).setdefault(edge.target_id, []).append(edge.source_id)
+        
+        # Count endpoint occurrences in C; edges may reference nodes outside the result
+        edges = graph_result.edges
+        sources = np.fromiter(
+            (node_positions.setdefault(edge.source_id, len(node_positions)) for edge in edges),
+            dtype=np.intp, count=len(edges)
+        )
+        targets = np.fromiter(
+            (node_positions.setdefault(edge.target_id, len(node_positions)) for edge in edges),
+            dtype=np.intp, count=len(edges)
+        )
+        degrees = np.bincount(np.concatenate([sources, targets]), minlength=len(node_positions))
+        
+        return cls(
+            out_edges_by_type=out_edges,
+            in_edges_by_type=in_edges,
+            nodes_by_type=nodes_by_type,
+            node_positions=node_positions,
+            degrees=degrees,
+        )
+    
+    def out_edges(self, relationship_type: str) -> Dict[str, List[str]]:
+        """Map each source id to its targets over one relationship type."""
+        return self.out_edges_by_type.get(relationship_type, {})
+    
+    def in_edges(self, relationship_type: str) -> Dict[str, List[str]]:
+        """Map each target id to its sources over one relationship type."""
+        return self.in_edges_by_type.get(relationship_type, {})
+    
+    def nodes_of_type(self, node_type: str) -> List[GraphNode]:
+        """Get the nodes of one type."""
+        return self.nodes_by_type.get(node_type, [])
+
 
 class GraphReranker:
     """Reranker that uses graph references to improve search results."""
@@ -23,262 +119,211 @@ class GraphReranker:
         if not results:
             return results
         
-        self.logger.info(f"Reranking {len(results)} results using graph information")
+        # Pass format arguments so loguru only formats when INFO is enabled
+        self.logger.info("Reranking {} results using graph information", len(results))
         
-        # Calculate graph-based scores for each result
+        # Fetch graph context for all results in one lookup, off the event loop
+        # since the graph clients are blocking
+        chunk_ids = [result.chunk.id for result in results]
+        try:
+            graph_results = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: self.neo4j_client.find_related_chunks_batch(
+                    chunk_ids,
+                    relationship_types=["CALLS", "DEFINED_IN", "CONTAINS", "HAS_METHOD"],
+                    max_hops=2
+                )
+            )
+        except Exception as e:
+            self.logger.error(f"Error fetching graph context for {len(chunk_ids)} chunks: {e}")
+            graph_results = {}
+        
+        # Calculate graph-based scores for all results with one matrix product
+        graph_scores = self._calculate_feature_scores(
+            self._build_feature_matrix(results, query, graph_results)
+        )
+        original_scores = np.fromiter((result.score for result in results),
+                                      dtype=np.float64, count=len(results))
+        
+        # Combine original scores with graph scores, then select and sort the top_k
+        combined_scores = self._combine_scores(original_scores, graph_scores)
+        candidates = np.arange(len(results))
+        if 0 < top_k < len(results):
+            candidates = np.argpartition(-combined_scores, top_k - 1)[:top_k]
+        order = candidates[np.argsort(-combined_scores[candidates], kind="stable")][:top_k]
+        
+        # Update and re-rank the kept results
         reranked_results = []
-        
-        for result in results:
-            # Get graph context for the chunk
-            graph_score = await self._calculate_graph_score(result, query)
-            
-            # Combine original score with graph score
-            combined_score = self._combine_scores(result.score, graph_score)
-            
-            # Update result
+        for rank, (i, graph_score, combined_score) in enumerate(
+            zip(order.tolist(), graph_scores[order].tolist(), combined_scores[order].tolist()), start=1
+        ):
+            result = results[i]
             result.score = combined_score
+            result.rank = rank
             result.metadata["graph_score"] = graph_score
             result.metadata["combined_score"] = combined_score
-            
             reranked_results.append(result)
         
-        # Sort by combined score
-        reranked_results.sort(key=lambda x: x.score, reverse=True)
-        
-        # Re-rank
-        for i, result in enumerate(reranked_results):
-            result.rank = i + 1
-        
-        self.logger.info(f"Reranking completed, top result score: {reranked_results[0].score if reranked_results else 0}")
+        self.logger.info("Reranking completed, top result score: {}",
+                         reranked_results[0].score if reranked_results else 0)
         
-        return reranked_results[:top_k]
+        return reranked_results
     
-    async def _calculate_graph_score(self, result: SearchResult, query: str) -> float:
-        """Calculate graph-based score for a result."""
-        try:
-            chunk_id = result.chunk.id
-            
-            # Get related chunks from graph
-            graph_result = self.neo4j_client.find_related_chunks(
-                chunk_id,
-                relationship_types=["CALLS", "DEFINED_IN", "CONTAINS", "HAS_METHOD"],
-                max_hops=2
-            )
-            
-            # Calculate various graph-based features
-            features = await self._extract_graph_features(result, query, graph_result)
-            
-            # Calculate final graph score
-            graph_score = self._calculate_feature_score(features)
-            
-            return graph_score
+    def _build_feature_matrix(self, results: List[SearchResult], query: str,
+                              graph_results: Dict[str, GraphResult]) -> np.ndarray:
+        """Stack the graph features of each result into a (results x features) matrix."""
+        features = np.zeros((len(results), len(FEATURE_KEYS)), dtype=np.float32)
+        
+        for i, result in enumerate(results):
+            # Chunks that are not in the graph keep all-zero features, and so no graph score
+            graph_result = graph_results.get(result.chunk.id)
+            if graph_result is None:
+                continue
             
-        except Exception as e:
-            self.logger.error(f"Error calculating graph score for {chunk_id}: {e}")
-            return 0.0
+            try:
+                features[i] = self._extract_graph_features(result, query, graph_result)
+            except Exception as e:
+                self.logger.error(f"Error calculating graph score for {result.chunk.id}: {e}")
+        
+        return features
     
-    async def _extract_graph_features(self, result: SearchResult, query: str, 
-                                    graph_result: GraphResult) -> Dict[str, Any]:
-        """Extract graph-based features for reranking."""
-        features = {}
+    def _extract_graph_features(self, result: SearchResult, query: str, 
+                                graph_result: GraphResult) -> np.ndarray:
+        """Extract graph-based features for reranking, in FEATURE_KEYS order."""
+        features = np.zeros(len(FEATURE_KEYS), dtype=np.float32)
+        index = GraphIndex.from_graph_result(graph_result)
+        total_nodes = len(graph_result.nodes)
         
         # Basic graph metrics
-        features["node_count"] = len(graph_result.nodes)
-        features["edge_count"] = len(graph_result.edges)
-        features["degree_centrality"] = self._calculate_degree_centrality(graph_result)
+        features[FEATURE_INDEX["degree_centrality"]] = self._calculate_degree_centrality(index, total_nodes)
         
         # Query relevance features
-        features["query_function_matches"] = self._count_query_function_matches(query, graph_result)
-        features["query_class_matches"] = self._count_query_class_matches(query, graph_result)
+        features[FEATURE_INDEX["query_function_matches"]] = self._count_query_function_matches(query, index)
+        features[FEATURE_INDEX["query_class_matches"]] = self._count_query_class_matches(query, index)
         
         # Code structure features
-        features["function_depth"] = self._calculate_function_depth(result, graph_result)
-        features["class_hierarchy_depth"] = self._calculate_class_hierarchy_depth(result, graph_result)
+        features[FEATURE_INDEX["function_depth"]] = self._calculate_function_depth(result, index)
+        features[FEATURE_INDEX["class_hierarchy_depth"]] = self._calculate_class_hierarchy_depth(result, index)
         
         # Importance features
-        features["call_frequency"] = self._calculate_call_frequency(result, graph_result)
-        features["inheritance_importance"] = self._calculate_inheritance_importance(result, graph_result)
+        features[FEATURE_INDEX["call_frequency"]] = self._calculate_call_frequency(result, index, total_nodes)
+        features[FEATURE_INDEX["inheritance_importance"]] = self._calculate_inheritance_importance(
+            result, index, total_nodes
+        )
         
         # Code quality features
-        features["code_complexity"] = self._estimate_code_complexity(result)
-        features["documentation_score"] = self._calculate_documentation_score(result)
+        code_complexity, documentation_score = self._analyze_chunk_text(result.chunk.content)
+        features[FEATURE_INDEX["code_complexity"]] = code_complexity
+        features[FEATURE_INDEX["documentation_score"]] = documentation_score
         
         return features
     
-    def _calculate_degree_centrality(self, graph_result: GraphResult) -> float:
+    def _calculate_degree_centrality(self, index: GraphIndex, total_nodes: int) -> float:
         """Calculate degree centrality of the chunk in the graph."""
-        if not graph_result.nodes:
-            return 0.0
-        
-        # Count connections for each node
-        node_degrees = defaultdict(int)
-        
-        for edge in graph_result.edges:
-            node_degrees[edge.source_id] += 1
-            node_degrees[edge.target_id] += 1
-        
-        if not node_degrees:
+        if total_nodes == 0 or not index.degrees.any():
             return 0.0
         
         # Return max degree (representing the most connected node)
-        return max(node_degrees.values()) / len(graph_result.nodes)
+        return int(index.degrees.max()) / total_nodes
     
-    def _count_query_function_matches(self, query: str, graph_result: GraphResult) -> int:
+    def _count_query_function_matches(self, query: str, index: GraphIndex) -> int:
         """Count how many function names in the graph match the query."""
         query_lower = query.lower()
-        function_nodes = [node for node in graph_result.nodes if node.type == "Function"]
-        
-        matches = 0
-        for node in function_nodes:
-            if query_lower in node.id.lower():
-                matches += 1
-        
-        return matches
+        return sum(1 for node in index.nodes_of_type("Function") if query_lower in node.id.lower())
     
-    def _count_query_class_matches(self, query: str, graph_result: GraphResult) -> int:
+    def _count_query_class_matches(self, query: str, index: GraphIndex) -> int:
         """Count how many class names in the graph match the query."""
         query_lower = query.lower()
-        class_nodes = [node for node in graph_result.nodes if node.type == "Class"]
-        
-        matches = 0
-        for node in class_nodes:
-            if query_lower in node.id.lower():
-                matches += 1
-        
-        return matches
+        return sum(1 for node in index.nodes_of_type("Class") if query_lower in node.id.lower())
     
-    def _calculate_function_depth(self, result: SearchResult, graph_result: GraphResult) -> int:
+    def _calculate_function_depth(self, result: SearchResult, index: GraphIndex) -> int:
         """Calculate the depth of function calls."""
         # Find the function containing this chunk
         function_nodes = [
-            node for node in graph_result.nodes 
-            if node.type == "Function" and node.id != result.chunk.id
+            node for node in index.nodes_of_type("Function")
+            if node.id != result.chunk.id
         ]
         
         if not function_nodes:
             return 0
         
         # Calculate maximum call depth
-        max_depth = 0
-        for node in function_nodes:
-            depth = self._calculate_function_call_depth(node.id, graph_result, 0)
-            max_depth = max(max_depth, depth)
-        
-        return max_depth
-    
-    def _calculate_function_call_depth(self, function_id: str, graph_result: GraphResult, 
-                                     current_depth: int) -> int:
-        """Recursively calculate function call depth."""
-        if current_depth > 10:  # Prevent infinite recursion
-            return current_depth
-        
-        # Find functions called by this function
-        called_functions = []
-        for edge in graph_result.edges:
-            if edge.source_id == function_id and edge.relationship_type == "CALLS":
-                called_functions.append(edge.target_id)
-        
-        if not called_functions:
-            return current_depth
-        
-        max_depth = current_depth
-        for called_func in called_functions:
-            depth = self._calculate_function_call_depth(called_func, graph_result, current_depth + 1)
-            max_depth = max(max_depth, depth)
-        
-        return max_depth
+        return self._max_chain_depth(index.out_edges("CALLS"), (node.id for node in function_nodes))
     
-    def _calculate_class_hierarchy_depth(self, result: SearchResult, graph_result: GraphResult) -> int:
+    def _calculate_class_hierarchy_depth(self, result: SearchResult, index: GraphIndex) -> int:
         """Calculate the depth of class hierarchy."""
-        class_nodes = [node for node in graph_result.nodes if node.type == "Class"]
+        class_nodes = index.nodes_of_type("Class")
         
         if not class_nodes:
             return 0
         
-        max_depth = 0
-        for node in class_nodes:
-            depth = self._calculate_class_inheritance_depth(node.id, graph_result, 0)
-            max_depth = max(max_depth, depth)
-        
-        return max_depth
+        return self._max_chain_depth(index.out_edges("INHERITS_FROM"), (node.id for node in class_nodes))
     
-    def _calculate_class_inheritance_depth(self, class_id: str, graph_result: GraphResult, 
-                                         current_depth: int) -> int:
-        """Recursively calculate class inheritance depth."""
-        if current_depth > 10:  # Prevent infinite recursion
-            return current_depth
-        
-        # Find parent classes
-        parent_classes = []
-        for edge in graph_result.edges:
-            if edge.source_id == class_id and edge.relationship_type == "INHERITS_FROM":
-                parent_classes.append(edge.target_id)
-        
-        if not parent_classes:
-            return current_depth
+    def _max_chain_depth(self, adjacency: Dict[str, List[str]], start_ids: Iterable[str]) -> int:
+        """Get the longest chain length from any start node, walking the adjacency iteratively."""
+        depths = {}  # Finished nodes -> longest chain length from them
+        visiting = set()
+        max_depth = 0
         
-        max_depth = current_depth
-        for parent_class in parent_classes:
-            depth = self._calculate_class_inheritance_depth(parent_class, graph_result, current_depth + 1)
-            max_depth = max(max_depth, depth)
+        for start_id in start_ids:
+            if start_id not in depths:
+                # Each frame is [node_id, remaining neighbours, longest chain so far]
+                stack = [[start_id, iter(adjacency.get(start_id, ())), 0]]
+                visiting.add(start_id)
+                while stack:
+                    frame = stack[-1]
+                    for next_id in frame[1]:
+                        if next_id in visiting:
+                            # Edge back into the current chain closes a cycle, don't follow it
+                            continue
+                        if next_id not in depths:
+                            visiting.add(next_id)
+                            stack.append([next_id, iter(adjacency.get(next_id, ())), 0])
+                            break
+                        frame[2] = max(frame[2], depths[next_id] + 1)
+                    else:
+                        # All neighbours done, fold this node's depth into its caller
+                        stack.pop()
+                        visiting.discard(frame[0])
+                        depths[frame[0]] = frame[2]
+                        if stack:
+                            stack[-1][2] = max(stack[-1][2], frame[2] + 1)
+            max_depth = max(max_depth, depths[start_id])
         
         return max_depth
     
-    def _calculate_call_frequency(self, result: SearchResult, graph_result: GraphResult) -> float:
+    def _calculate_call_frequency(self, result: SearchResult, index: GraphIndex,
+                                  total_nodes: int) -> float:
         """Calculate how frequently this chunk is called by other functions."""
-        chunk_id = result.chunk.id
-        
-        # Count incoming calls
-        incoming_calls = 0
-        for edge in graph_result.edges:
-            if edge.target_id == chunk_id and edge.relationship_type == "CALLS":
-                incoming_calls += 1
-        
-        # Normalize by total nodes
-        total_nodes = len(graph_result.nodes)
+        # Normalize incoming calls by total nodes
         if total_nodes == 0:
             return 0.0
         
+        incoming_calls = len(index.in_edges("CALLS").get(result.chunk.id, ()))
         return incoming_calls / total_nodes
     
-    def _calculate_inheritance_importance(self, result: SearchResult, graph_result: GraphResult) -> float:
+    def _calculate_inheritance_importance(self, result: SearchResult, index: GraphIndex,
+                                          total_nodes: int) -> float:
         """Calculate inheritance importance (how many classes inherit from this)."""
-        chunk_id = result.chunk.id
-        
-        # Count children classes
-        children_classes = 0
-        for edge in graph_result.edges:
-            if edge.target_id == chunk_id and edge.relationship_type == "INHERITS_FROM":
-                children_classes += 1
-        
-        # Normalize by total nodes
-        total_nodes = len(graph_result.nodes)
+        # Normalize children classes by total nodes
         if total_nodes == 0:
             return 0.0
         
+        children_classes = len(index.in_edges("INHERITS_FROM").get(result.chunk.id, ()))
         return children_classes / total_nodes
     
-    def _estimate_code_complexity(self, result: SearchResult) -> float:
-        """Estimate code complexity based on chunk content."""
-        content = result.chunk.content
-        
-        # Simple complexity metrics
-        lines = content.split('\n')
-        complexity_score = 0
+    def _analyze_chunk_text(self, content: str) -> Tuple[float, float]:
+        """Estimate code complexity and documentation score of chunk content.
         
+        Control keywords count once per distinct keyword on a line; the other
+        line-level counts are single regex scans over the content.
+        """
         # Count control structures
-        control_keywords = ['if', 'else', 'elif', 'for', 'while', 'try', 'except', 'catch', 'switch']
-        for line in lines:
-            for keyword in control_keywords:
-                if keyword in line.lower():
-                    complexity_score += 1
+        complexity_score = sum(len(set(CONTROL_KEYWORD_RE.findall(line)))
+                               for line in content.lower().split('\n'))
         
         # Count nested structures (approximate by indentation)
-        max_indentation = 0
-        for line in lines:
-            if line.strip():  # Skip empty lines
-                indent = len(line) - len(line.lstrip())
-                max_indentation = max(max_indentation, indent)
+        max_indentation = max((len(match) for match in INDENTATION_RE.findall(content)), default=0)
         
         complexity_score += max_indentation // 4  # Assuming 4 spaces per indent
         
@@ -287,94 +332,35 @@ class GraphReranker:
         if content_length > 0:
             complexity_score = complexity_score / (content_length / 1000)  # Per 1000 characters
         
-        return min(complexity_score, 1.0)  # Cap at 1.0
-    
-    def _calculate_documentation_score(self, result: SearchResult) -> float:
-        """Calculate documentation score based on comments and docstrings."""
-        content = result.chunk.content
-        lines = content.split('\n')
-        
-        documentation_lines = 0
-        for line in lines:
-            stripped = line.strip()
-            if stripped.startswith('#') or stripped.startswith('//') or stripped.startswith('/*'):
-                documentation_lines += 1
-            elif '"""' in stripped or "'''" in stripped:
-                documentation_lines += 1
-        
         # Calculate ratio of documentation lines to total lines
-        total_lines = len([line for line in lines if line.strip()])
+        total_lines = len(NON_BLANK_LINE_RE.findall(content))
         if total_lines == 0:
-            return 0.0
+            doc_ratio = 0.0
+        else:
+            doc_ratio = len(DOCUMENTATION_LINE_RE.findall(content)) / total_lines
         
-        doc_ratio = documentation_lines / total_lines
-        return min(doc_ratio, 1.0)  # Cap at 1.0
+        return min(complexity_score, 1.0), min(doc_ratio, 1.0)  # Cap at 1.0
     
-    def _calculate_feature_score(self, features: Dict[str, Any]) -> float:
-        """Calculate final graph score from features."""
-        # Feature weights (can be tuned)
-        weights = {
-            "degree_centrality": 0.2,
-            "query_function_matches": 0.3,
-            "query_class_matches": 0.3,
-            "function_depth": 0.1,
-            "class_hierarchy_depth": 0.1,
-            "call_frequency": 0.2,
-            "inheritance_importance": 0.2,
-            "code_complexity": 0.1,
-            "documentation_score": 0.1,
-        }
-        
-        # Normalize features
-        normalized_features = {}
-        for key, value in features.items():
-            if key in weights:
-                normalized_features[key] = min(value / max(1, weights[key]), 1.0)
-        
-        # Calculate weighted score
-        total_score = 0
-        total_weight = 0
-        
-        for key, weight in weights.items():
-            if key in normalized_features:
-                total_score += normalized_features[key] * weight
-                total_weight += weight
-        
-        if total_weight == 0:
-            return 0.0
-        
-        return total_score / total_weight
+    def _calculate_feature_scores(self, features: np.ndarray) -> np.ndarray:
+        """Calculate final graph scores from a (results x features) matrix."""
+        # Clip features to [0, 1] and take their weighted average
+        return (np.clip(features, 0.0, 1.0) @ FEATURE_WEIGHT_VECTOR) / FEATURE_WEIGHT_SUM
     
-    def _combine_scores(self, original_score: float, graph_score: float) -> float:
-        """Combine original search score with graph score."""
-        # Use threshold to determine how much to weight graph score
-        if graph_score > self.threshold:
-            # High graph score, give it more weight
-            graph_weight = 0.4
-            original_weight = 0.6
-        else:
-            # Low graph score, rely more on original score
-            graph_weight = 0.2
-            original_weight = 0.8
-        
-        combined_score = original_score * original_weight + graph_score * graph_weight
-        return combined_score
+    def _combine_scores(self, original_scores: np.ndarray, graph_scores: np.ndarray) -> np.ndarray:
+        """Combine original search scores with graph scores."""
+        # Use threshold to determine how much to weight graph score:
+        # high graph scores get more weight, otherwise rely more on the original score
+        high_graph = graph_scores > self.threshold
+        graph_weights = np.where(high_graph, 0.4, 0.2)
+        original_weights = np.where(high_graph, 0.6, 0.8)
+        
+        return original_scores * original_weights + graph_scores * graph_weights
     
     def get_rerank_stats(self) -> Dict[str, Any]:
         """Get reranker statistics."""
         return {
             "threshold": self.threshold,
-            "feature_weights": {
-                "degree_centrality": 0.2,
-                "query_function_matches": 0.3,
-                "query_class_matches": 0.3,
-                "function_depth": 0.1,
-                "class_hierarchy_depth": 0.1,
-                "call_frequency": 0.2,
-                "inheritance_importance": 0.2,
-                "code_complexity": 0.1,
-                "documentation_score": 0.1,
-            },
+            "feature_weights": FEATURE_WEIGHTS,
         }
 
 
@@ -389,7 +375,8 @@ class ConflictResolutionReranker:
                          query: str,
                          top_k: int = 10) -> List[SearchResult]:
         """Resolve conflicts between vector and BM25 search results."""
-        self.logger.info(f"Resolving conflicts between {len(vector_results)} vector and {len(bm25_results)} BM25 results")
+        self.logger.info("Resolving conflicts between {} vector and {} BM25 results",
+                         len(vector_results), len(bm25_results))
         
         # Identify conflicts
         conflicts = self._identify_conflicts(vector_results, bm25_results)
@@ -411,6 +398,10 @@ class ConflictResolutionReranker:
         """Identify conflicts between vector and BM25 results."""
         conflicts = []
         
+        # Index results by chunk id, keeping the first occurrence of each
+        vector_by_id = {r.chunk.id: r for r in reversed(vector_results)}
+        bm25_by_id = {r.chunk.id: r for r in reversed(bm25_results)}
+        
         # Get top results from each method
         vector_top = set(r.chunk.id for r in vector_results[:5])
         bm25_top = set(r.chunk.id for r in bm25_results[:5])
@@ -419,27 +410,27 @@ class ConflictResolutionReranker:
         for v_result in vector_results[:5]:
             if v_result.chunk.id not in bm25_top:
                 # High in vector, low in BM25
-                bm25_rank = next((r.rank for r in bm25_results if r.chunk.id == v_result.chunk.id), len(bm25_results))
+                bm25_result = bm25_by_id.get(v_result.chunk.id)
                 conflicts.append({
                     "chunk_id": v_result.chunk.id,
                     "type": "vector_high_bm25_low",
                     "vector_rank": v_result.rank,
-                    "bm25_rank": bm25_rank,
+                    "bm25_rank": bm25_result.rank if bm25_result else len(bm25_results),
                     "vector_result": v_result,
-                    "bm25_result": next((r for r in bm25_results if r.chunk.id == v_result.chunk.id), None),
+                    "bm25_result": bm25_result,
                 })
         
         for b_result in bm25_results[:5]:
             if b_result.chunk.id not in vector_top:
                 # High in BM25, low in vector
-                vector_rank = next((r.rank for r in vector_results if r.chunk.id == b_result.chunk.id), len(vector_results))
+                vector_result = vector_by_id.get(b_result.chunk.id)
                 conflicts.append({
                     "chunk_id": b_result.chunk.id,
                     "type": "bm25_high_vector_low",
                     "bm25_rank": b_result.rank,
-                    "vector_rank": vector_rank,
+                    "vector_rank": vector_result.rank if vector_result else len(vector_results),
                     "bm25_result": b_result,
-                    "vector_result": next((r for r in vector_results if r.chunk.id == b_result.chunk.id), None),
+                    "vector_result": vector_result,
                 })
         
         return conflicts
@@ -448,12 +439,12 @@ class ConflictResolutionReranker:
         """Resolve conflicts using query analysis."""
         resolved_scores = {}
         
+        # Analyze query type
+        query_type = self._analyze_query_type(query)
+        
         for conflict in conflicts:
             chunk_id = conflict["chunk_id"]
             
-            # Analyze query type
-            query_type = self._analyze_query_type(query)
-            
             # Choose winner based on query type
             if query_type == "semantic":
                 # Prefer vector results for semantic queries
@@ -478,11 +469,8 @@ class ConflictResolutionReranker:
         query_lower = query.lower()
         
         # Check for keyword indicators
-        keyword_indicators = ['function', 'class', 'method', 'variable', 'import', 'def', 'class']
-        semantic_indicators = ['how to', 'what is', 'explain', 'implement', 'algorithm', 'pattern']
-        
-        keyword_count = sum(1 for indicator in keyword_indicators if indicator in query_lower)
-        semantic_count = sum(1 for indicator in semantic_indicators if indicator in query_lower)
+        keyword_count = sum(1 for indicator in KEYWORD_QUERY_INDICATORS if indicator in query_lower)
+        semantic_count = sum(1 for indicator in SEMANTIC_QUERY_INDICATORS if indicator in query_lower)
         
         if semantic_count > keyword_count:
             return "semantic"
@@ -496,62 +484,33 @@ class ConflictResolutionReranker:
                                  top_k: int) -> List[SearchResult]:
         """Combine results when there are no conflicts."""
         # Simple average of scores
-        combined_dict = {}
-        
-        for result in vector_results + bm25_results:
-            chunk_id = result.chunk.id
-            if chunk_id not in combined_dict:
-                combined_dict[chunk_id] = []
-            combined_dict[chunk_id].append(result)
-        
         final_results = []
-        for chunk_id, results in combined_dict.items():
-            avg_score = sum(r.score for r in results) / len(results)
-            best_result = max(results, key=lambda x: x.score)
+        for results in self._group_by_chunk_id(chain(vector_results, bm25_results)).values():
+            avg_score, best_result, original_scores = self._summarize_group(results)
             
             final_result = SearchResult(
                 chunk=best_result.chunk,
                 score=avg_score,
                 rank=0,  # Will be set later
                 search_type="combined",
-                metadata={"original_scores": [r.score for r in results]},
+                metadata={"original_scores": original_scores},
             )
             final_results.append(final_result)
         
-        # Sort and rank
-        final_results.sort(key=lambda x: x.score, reverse=True)
-        for i, result in enumerate(final_results):
-            result.rank = i + 1
-        
-        return final_results[:top_k]
+        return self._rank_and_truncate(final_results, top_k)
     
     def _combine_results(self, vector_results: List[SearchResult], 
                          bm25_results: List[SearchResult],
                          resolved_scores: Dict[str, float],
                          top_k: int) -> List[SearchResult]:
         """Combine all results with conflict resolution."""
-        # Create a dictionary of all results
-        all_results = {}
-        
-        for result in vector_results + bm25_results:
-            chunk_id = result.chunk.id
-            if chunk_id not in all_results:
-                all_results[chunk_id] = []
-            all_results[chunk_id].append(result)
-        
         # Apply conflict resolution
         final_results = []
-        for chunk_id, results in all_results.items():
-            if chunk_id in resolved_scores:
-                # Apply resolution score
-                resolution_factor = resolved_scores[chunk_id]
-                avg_score = sum(r.score for r in results) / len(results)
-                final_score = avg_score * resolution_factor
-            else:
-                # No conflict, use average
-                final_score = sum(r.score for r in results) / len(results)
+        for chunk_id, results in self._group_by_chunk_id(chain(vector_results, bm25_results)).items():
+            avg_score, best_result, original_scores = self._summarize_group(results)
             
-            best_result = max(results, key=lambda x: x.score)
+            # Apply resolution score; without a conflict, use the average
+            final_score = avg_score * resolved_scores.get(chunk_id, 1.0)
             
             final_result = SearchResult(
                 chunk=best_result.chunk,
@@ -559,15 +518,37 @@ class ConflictResolutionReranker:
                 rank=0,  # Will be set later
                 search_type="resolved",
                 metadata={
-                    "original_scores": [r.score for r in results],
+                    "original_scores": original_scores,
                     "resolved": chunk_id in resolved_scores,
                 },
             )
             final_results.append(final_result)
         
-        # Sort and rank
-        final_results.sort(key=lambda x: x.score, reverse=True)
-        for i, result in enumerate(final_results):
+        return self._rank_and_truncate(final_results, top_k)
+    
+    def _group_by_chunk_id(self, results: Iterable[SearchResult]) -> Dict[str, List[SearchResult]]:
+        """Group results by chunk id, preserving first-seen order."""
+        grouped = {}
+        for result in results:
+            grouped.setdefault(result.chunk.id, []).append(result)
+        return grouped
+    
+    def _summarize_group(self, results: List[SearchResult]) -> Tuple[float, SearchResult, List[float]]:
+        """Get the average score, best result and original scores of a group in one pass."""
+        total = 0.0
+        best_result = results[0]
+        original_scores = []
+        for result in results:
+            total += result.score
+            original_scores.append(result.score)
+            if result.score > best_result.score:
+                best_result = result
+        return total / len(results), best_result, original_scores
+    
+    def _rank_and_truncate(self, results: List[SearchResult], top_k: int) -> List[SearchResult]:
+        """Select the top_k results by score and assign their ranks."""
+        top_results = heapq.nlargest(top_k, results, key=lambda x: x.score)
+        for i, result in enumerate(top_results):
             result.rank = i + 1
         
-        return final_results[:top_k]
\ No newline at end of file
+        return top_results
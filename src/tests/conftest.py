@@ -1,20 +1,63 @@
+import functools
 import pytest
 import os
+import shutil
 import tempfile
+import numpy as np
 from pathlib import Path
-from typing import Generator, Dict, Any
+from typing import Generator, Dict, Any, TYPE_CHECKING
 import time
-import sys
-
-# Add src to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+import uuid
 
 from src.config import settings
 from src.graph.json_graph_client import JsonGraphClient
-from src.query.milvus_client import MilvusClient
-from src.processor.content_processor import ContentProcessor
 from src.scanner.local_codebase_scanner import LocalCodebaseScanner
-from src.types import CodeFile, FileType
+from src.types import CodeChunk, CodeFile, FileType
+
+if TYPE_CHECKING:
+    from src.processor.content_processor import ContentProcessor
+    from src.query.milvus_client import MilvusClient
+
+SAMPLE_CODEBASE_DIR = Path(__file__).parent / "fixtures" / "sample_codebase"
+
+# pymilvus connection alias opened once per test session
+MILVUS_TEST_ALIAS = "codex7_tests"
+
+# Fixture files are test data, not test modules
+collect_ignore = ["fixtures"]
+
+
+def pytest_configure(config):
+    """Register custom markers."""
+    config.addinivalue_line(
+        "markers",
+        "requires_language(*names): skip unless tree-sitter parsers for the languages are available",
+    )
+    # Registered by pytest-xdist when installed; declared here so serial runs don't warn
+    config.addinivalue_line("markers", "xdist_group(name): run tests in the same group on one xdist worker")
+
+
+@functools.cache
+def available_languages() -> frozenset:
+    """Languages with a tree-sitter parser, probed once per session."""
+    from src.processor.content_processor import ASTParser
+    
+    return frozenset(ASTParser().parsers)
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip tests marked requires_language when a parser is missing.
+    
+    Done at collection so skipped tests never set up their fixtures.
+    """
+    for item in items:
+        marker = item.get_closest_marker("requires_language")
+        if marker is None:
+            continue
+        
+        missing = [name for name in marker.args if name not in available_languages()]
+        if missing:
+            item.add_marker(pytest.mark.skip(reason=f"AST parser not available for: {', '.join(missing)}"))
 
 
 @pytest.fixture(scope="session")
@@ -26,11 +69,19 @@ def test_settings():
     original_settings['graph_storage_path'] = settings.graph_storage_path
     original_settings['milvus_host'] = settings.milvus_host
     original_settings['milvus_port'] = settings.milvus_port
+    original_settings['milvus_collection_name'] = settings.milvus_collection_name
+    original_settings['milvus_dimension'] = settings.milvus_dimension
     
     # Use standard environment variables
     settings.graph_storage_path = os.getenv('GRAPH_STORAGE_PATH', 'test_graph.json')
     settings.milvus_host = os.getenv('MILVUS_HOST', 'localhost')
     settings.milvus_port = int(os.getenv('MILVUS_PORT', '19530'))
+    # Test vectors are 768-dimensional, like the default Ollama model's
+    settings.milvus_dimension = int(os.getenv('MILVUS_DIMENSION', '768'))
+    
+    # One collection per xdist worker and session, so parallel runs never share one
+    worker_id = os.getenv('PYTEST_XDIST_WORKER', 'master')
+    settings.milvus_collection_name = f"test_chunks_{worker_id}_{uuid.uuid4().hex[:6]}"
     
     yield settings
     
@@ -40,41 +91,52 @@ def test_settings():
 
 
 @pytest.fixture
-def graph_client(test_settings) -> Generator[JsonGraphClient, None, None]:
-    """Create JSON graph client for testing."""
-    client = JsonGraphClient(settings.graph_storage_path)
+def graph_client(tmp_path: Path) -> JsonGraphClient:
+    """Create JSON graph client for testing, stored in the test's temporary directory."""
+    # tmp_path is removed by pytest, and is separate for each test and xdist worker
+    return JsonGraphClient(str(tmp_path / "graph_data.json"))
+
+
+@pytest.fixture(scope="session")
+def milvus_session_client(test_settings) -> Generator["MilvusClient", None, None]:
+    """Create one Milvus client (and connection) shared by the whole test session."""
+    # Imported here so collection doesn't load pymilvus
+    from src.query.milvus_client import MilvusClient
+    
+    # A dedicated alias keeps the test connection apart from any "default" one
+    client = MilvusClient(alias=MILVUS_TEST_ALIAS)
     
     yield client
     
-    # Cleanup: Clear test data
+    # Cleanup: Drop test collections and disconnect
     try:
-        client.clear_database()
-        # Remove test file if it exists
-        import os
-        if os.path.exists(settings.graph_storage_path):
-            os.remove(settings.graph_storage_path)
+        client.drop_collection()
+        client.close()
     except Exception as e:
-        print(f"Error cleaning up JSON graph: {e}")
+        print(f"Error cleaning up Milvus: {e}")
 
 
 @pytest.fixture
-def milvus_client(test_settings) -> Generator[MilvusClient, None, None]:
-    """Create Milvus client for testing."""
-    client = MilvusClient()
+def milvus_client(milvus_session_client: "MilvusClient") -> Generator["MilvusClient", None, None]:
+    """Provide the shared Milvus client with a fresh collection for each test."""
+    # Recreate the collection dropped by the previous test
+    milvus_session_client._ensure_collection()
     
-    yield client
+    yield milvus_session_client
     
     # Cleanup: Drop test collections
     try:
-        client.drop_collection()
-        client.close()
+        milvus_session_client.drop_collection()
     except Exception as e:
         print(f"Error cleaning up Milvus: {e}")
 
 
-@pytest.fixture
-def content_processor() -> ContentProcessor:
-    """Create content processor for testing."""
+@pytest.fixture(scope="session")
+def content_processor() -> "ContentProcessor":
+    """Create one content processor shared by the whole test session."""
+    # Imported here so collection doesn't load tree-sitter and langchain
+    from src.processor.content_processor import ContentProcessor
+    
     return ContentProcessor()
 
 
@@ -84,86 +146,16 @@ def temp_codebase() -> Generator[Path, None, None]:
     with tempfile.TemporaryDirectory() as temp_dir:
         temp_path = Path(temp_dir)
         
-        # Create test Python file
-        python_file = temp_path / "test_file.py"
-        python_file.write_text("""
-def hello_world():
-    '''A simple hello world function.'''
-    print("Hello, World!")
-    return "Hello"
-
-class TestClass:
-    '''A test class.'''
-    
-    def __init__(self, name):
-        self.name = name
-    
-    def greet(self):
-        return f"Hello, {self.name}!"
-    
-    def calculate(self, x, y):
-        '''Calculate sum of two numbers.'''
-        return x + y
-
-def main():
-    test = TestClass("Test")
-    print(test.greet())
-    hello_world()
-
-if __name__ == "__main__":
-    main()
-""")
-        
-        # Create test JavaScript file
-        js_file = temp_path / "test_file.js"
-        js_file.write_text("""
-function helloWorld() {
-    console.log("Hello, World!");
-    return "Hello";
-}
-
-class TestClass {
-    constructor(name) {
-        this.name = name;
-    }
-    
-    greet() {
-        return `Hello, ${this.name}!`;
-    }
-    
-    calculate(x, y) {
-        return x + y;
-    }
-}
-
-function main() {
-    const test = new TestClass("Test");
-    console.log(test.greet());
-    helloWorld();
-}
-
-main();
-""")
+        # Copy the sample Python, JavaScript and markdown files; tests may add more
+        shutil.copytree(SAMPLE_CODEBASE_DIR, temp_path, dirs_exist_ok=True)
         
-        # Create test markdown file
-        md_file = temp_path / "README.md"
-        md_file.write_text("""
-# Test Project
-
-This is a test project for testing the code analysis system.
-
-## Features
-
-- Test functions
-- Test classes
-- Documentation
+        yield temp_path
 
-## Usage
 
-Run the test files to see the output.
-""")
-        
-        yield temp_path
+@pytest.fixture
+def scanner(temp_codebase: Path) -> LocalCodebaseScanner:
+    """Create a scanner rooted at the temporary codebase."""
+    return LocalCodebaseScanner(str(temp_codebase))
 
 
 @pytest.fixture
@@ -199,9 +191,25 @@ class SampleClass:
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
+def chunk_template() -> CodeChunk:
+    """Python function chunk for tests to copy with dataclasses.replace; never modify it."""
+    return CodeChunk(
+        id="template_chunk",
+        file_path="test.py",
+        content="def template():\n    pass",
+        start_line=1,
+        end_line=2,
+        language="python",
+        chunk_type="function_definition",
+        metadata={"file_size": 100},
+        embedding=np.zeros(768, dtype=np.float32),
+    )
+
+
+@pytest.fixture(scope="session")
 def sample_metadata() -> Dict[str, Any]:
-    """Sample metadata for testing."""
+    """Sample metadata for testing, shared by the session; tests must not modify it."""
     return {
         'file_size': 1024,
         'file_type': 'code',
@@ -0,0 +1,27 @@
+
+function helloWorld() {
+    console.log("Hello, World!");
+    return "Hello";
+}
+
+class TestClass {
+    constructor(name) {
+        this.name = name;
+    }
+    
+    greet() {
+        return `Hello, ${this.name}!`;
+    }
+    
+    calculate(x, y) {
+        return x + y;
+    }
+}
+
+function main() {
+    const test = new TestClass("Test");
+    console.log(test.greet());
+    helloWorld();
+}
+
+main();
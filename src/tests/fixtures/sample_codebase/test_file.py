@@ -0,0 +1,26 @@
+
+def hello_world():
+    '''A simple hello world function.'''
+    print("Hello, World!")
+    return "Hello"
+
+class TestClass:
+    '''A test class.'''
+    
+    def __init__(self, name):
+        self.name = name
+    
+    def greet(self):
+        return f"Hello, {self.name}!"
+    
+    def calculate(self, x, y):
+        '''Calculate sum of two numbers.'''
+        return x + y
+
+def main():
+    test = TestClass("Test")
+    print(test.greet())
+    hello_world()
+
+if __name__ == "__main__":
+    main()
@@ -18,24 +18,56 @@ Options:
     --milvus-only   Only run Milvus tests
     --processor-only Only run content processor tests
     --integration-only Only run integration tests
-    --no-cleanup    Skip cleanup operations
+    --show-setup    Show fixture setup/teardown for every test
+    --parallel N    Run tests on N workers (requires pytest-xdist)
+    --timings       Report the 10 slowest tests
+    --lf            Rerun only the tests that failed last time
+    --ff            Run last time's failures first, then the rest
     --verbose       Verbose output
 """
 
 import sys
 import os
-import argparse
-from pathlib import Path
 
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
+# Files that must exist before any tests can run
+CRITICAL_FILES = (
+    "src/config.py",
+    "src/types.py",
+    "src/graph/neo4j_client.py",
+    "src/query/milvus_client.py",
+    "src/processor/content_processor.py",
+)
+
+# CRITICAL_FILES grouped by directory, so each directory is listed once
+CRITICAL_FILES_BY_DIR = {}
+for _path in CRITICAL_FILES:
+    CRITICAL_FILES_BY_DIR.setdefault(os.path.dirname(_path), []).append(os.path.basename(_path))
+del _path
+
+# Set once check_environment has passed, so repeated checks are free
+_ENV_OK = False
+
+# Test files that use the shared databases, and so must not run concurrently; Milvus
+# tests get a collection per worker and don't need to be listed
+DATABASE_TEST_FILES = frozenset({
+    "src/tests/test_neo4j_client.py",
+    "src/tests/test_integration.py",
+})
+
+# Options passed to every pytest run: no sys.path rewrites
+BASE_PYTEST_ARGS = ("--import-mode=importlib",)
+
+# Keeps clean runs from reading or writing .pytest_cache; --lf/--ff need the cache
+NO_CACHE_ARGS = ("-p", "no:cacheprovider")
+
+# Separator printed around the pytest output
+BANNER_RULE = "=" * 60
+
 
 def run_tests(args):
     """Run tests based on arguments."""
     import pytest
     
-    pytest_args = []
-    
     # Determine which tests to run
     test_files = []
     
@@ -59,70 +91,93 @@ def run_tests(args):
             "src/tests/test_integration.py"
         ]
     
-    pytest_args.extend(test_files)
-    
-    # Add verbose flag
-    if args.verbose:
-        pytest_args.append("-v")
-        pytest_args.append("-s")
-    
-    # Add other pytest options
-    pytest_args.extend([
-        "--tb=short",  # Shorter traceback format
-        "--durations=10",  # Show 10 slowest tests
-    ])
-    
-    if not args.no_cleanup:
-        pytest_args.append("--setup-show")  # Show fixture setup/teardown
+    pytest_args = (
+        *test_files,
+        # Verbose runs get short tracebacks, otherwise one line per failure
+        *(("-v", "-s", "--tb=short") if args.verbose else ("--tb=line",)),
+        *(("--durations=10",) if args.timings else ()),  # Show 10 slowest tests
+        *BASE_PYTEST_ARGS,
+        *(("--last-failed",) if args.lf else ()),
+        *(("--failed-first",) if args.ff else ()),
+        *(() if args.lf or args.ff else NO_CACHE_ARGS),
+        *(("--setup-show",) if args.show_setup else ()),  # Show fixture setup/teardown
+        *(parallel_args(args.parallel, test_files) if args.parallel and not args.env_only else ()),
+    )
     
-    print("Running tests with arguments:", pytest_args)
-    print("=" * 60)
+    sys.stdout.write(f"Running tests with arguments: {pytest_args}\n{BANNER_RULE}\n")
+    sys.stdout.flush()  # Keep the header ahead of pytest's own output
     
     # Run tests
-    exit_code = pytest.main(pytest_args)
+    exit_code = pytest.main(list(pytest_args))
     
-    print("=" * 60)
     if exit_code == 0:
-        print("✓ All tests passed!")
+        summary = "✓ All tests passed!"
     else:
-        print(f"✗ Tests failed with exit code: {exit_code}")
+        summary = f"✗ Tests failed with exit code: {exit_code}"
+    sys.stdout.write(f"{BANNER_RULE}\n{summary}\n")
     
     return exit_code
 
 
+def parallel_args(workers, test_files):
+    """Get pytest-xdist arguments for running the given test files on several workers."""
+    import importlib.util
+    
+    if importlib.util.find_spec("xdist") is None:
+        print("pytest-xdist is not installed (pip install pytest-xdist), running tests serially")
+        return ()
+    
+    # Workers must agree on hash-based ordering
+    os.environ["PYTHONHASHSEED"] = "0"
+    
+    # Database tests are marked xdist_group("db") and must share one worker, which only
+    # loadgroup honours; without them, worksteal keeps fast workers busy
+    if any(test_file in DATABASE_TEST_FILES for test_file in test_files):
+        dist = "loadgroup"
+    else:
+        dist = "worksteal"
+    
+    return ("-n", str(workers), f"--dist={dist}")
+
+
 def check_environment():
     """Check if the environment is ready for testing."""
+    global _ENV_OK
+    if _ENV_OK:
+        return True
+    
     print("Checking environment...")
     
     # Check if we're in the right directory
-    if not Path("src/tests").exists():
+    if not os.path.isdir("src/tests"):
         print("Error: src/tests directory not found. Please run from project root.")
         return False
     
     # Check if critical files exist
-    critical_files = [
-        "src/config.py",
-        "src/types.py",
-        "src/graph/neo4j_client.py",
-        "src/query/milvus_client.py",
-        "src/processor/content_processor.py"
-    ]
-    
+    # One directory listing per directory instead of one stat per file
     missing_files = []
-    for file_path in critical_files:
-        if not Path(file_path).exists():
-            missing_files.append(file_path)
+    for directory, names in CRITICAL_FILES_BY_DIR.items():
+        try:
+            with os.scandir(directory) as entries:
+                present = {entry.name for entry in entries}
+        except FileNotFoundError:
+            present = set()
+        missing_files.extend(os.path.join(directory, name) for name in names if name not in present)
     
     if missing_files:
         print(f"Error: Missing critical files: {missing_files}")
         return False
     
     print("✓ Environment check passed")
+    _ENV_OK = True
     return True
 
 
 def main():
     """Main function."""
+    # Only needed when run as a script, and parses (or exits on --help) before any checks
+    import argparse
+    
     parser = argparse.ArgumentParser(
         description="Run comprehensive tests for the codebase analysis system"
     )
@@ -137,8 +192,16 @@ def main():
                        help="Only run content processor tests")
     parser.add_argument("--integration-only", action="store_true",
                        help="Only run integration tests")
-    parser.add_argument("--no-cleanup", action="store_true",
-                       help="Skip cleanup operations (keep test data)")
+    parser.add_argument("--show-setup", action="store_true",
+                       help="Show fixture setup/teardown for every test")
+    parser.add_argument("--parallel", type=int, metavar="N",
+                       help="Run tests on N workers with pytest-xdist")
+    parser.add_argument("--timings", action="store_true",
+                       help="Report the 10 slowest tests")
+    parser.add_argument("--lf", action="store_true",
+                       help="Rerun only the tests that failed last time (keeps .pytest_cache)")
+    parser.add_argument("--ff", action="store_true",
+                       help="Run last time's failures first (keeps .pytest_cache)")
     parser.add_argument("--verbose", "-v", action="store_true",
                        help="Verbose output")
     
@@ -0,0 +1,159 @@
+import asyncio
+import pytest
+from typing import List
+from pathlib import Path
+
+from src.types import CodeChunk, SearchHit, SearchResult
+from src.search.hybrid_search import BM25Search, HybridSearch
+
+
+def _make_chunks() -> List[CodeChunk]:
+    """Create a small corpus of code chunks."""
+    contents = [
+        "def parse_config(path):\n    return load_yaml(path)",
+        "class ConfigLoader:\n    def load(self, path):\n        return parse_config(path)",
+        "function renderTemplate(name) {\n    return templates[name];\n}",
+        "def connect_database(uri):\n    return Database(uri)",
+    ]
+    return [
+        CodeChunk(
+            id=f"chunk_{i}",
+            file_path=f"file_{i}.py",
+            content=content,
+            start_line=1,
+            end_line=content.count("\n") + 1,
+            language="python",
+            chunk_type="function_definition",
+            metadata={},
+        )
+        for i, content in enumerate(contents)
+    ]
+
+
+class FakeMilvusClient:
+    """Milvus stand-in that records which chunks are loaded by id."""
+    
+    def __init__(self, chunks: List[CodeChunk]):
+        self.chunks = {chunk.id: chunk for chunk in chunks}
+        self.loaded_ids: List[List[str]] = []
+    
+    def get_chunks_by_ids(self, chunk_ids):
+        self.loaded_ids.append(list(chunk_ids))
+        return {chunk_id: self.chunks[chunk_id] for chunk_id in chunk_ids if chunk_id in self.chunks}
+
+
+class TestBM25Search:
+    """Test BM25 keyword search."""
+    
+    def test_search_ranks_matching_chunks(self):
+        """Test that chunks containing the query tokens rank first."""
+        bm25 = BM25Search()
+        bm25.index_chunks(_make_chunks())
+        
+        results = bm25.search("load_yaml database", top_k=2)
+        
+        assert {chunk_id for chunk_id, _ in results} == {"chunk_0", "chunk_3"}
+        assert results[0][1] >= results[1][1] > 0
+    
+    def test_search_without_index(self):
+        """Test searching before anything is indexed."""
+        assert BM25Search().search("anything") == []
+    
+    def test_stats(self):
+        """Test index statistics."""
+        bm25 = BM25Search()
+        bm25.index_chunks(_make_chunks())
+        
+        stats = bm25.get_stats()
+        assert stats["indexed_documents"] == 4
+        assert stats["vocabulary_size"] > 0
+        assert bm25.get_document_frequency("path") == 2
+        assert bm25.get_document_frequency("missing_token") == 0
+    
+    def test_save_and_load(self, tmp_path: Path):
+        """Test that a reloaded index returns the same results."""
+        bm25 = BM25Search()
+        bm25.index_chunks(_make_chunks())
+        bm25.save(str(tmp_path / "bm25"))
+        
+        loaded = BM25Search()
+        loaded.load(str(tmp_path / "bm25"))
+        
+        expected = bm25.search("load_yaml renderTemplate", top_k=4)
+        actual = loaded.search("load_yaml renderTemplate", top_k=4)
+        
+        assert expected
+        assert actual == expected
+        assert loaded.get_stats() == bm25.get_stats()
+    
+    def test_save_empty_index(self, tmp_path: Path):
+        """Test that saving an empty index is rejected."""
+        with pytest.raises(ValueError):
+            BM25Search().save(str(tmp_path / "bm25"))
+    
+    def test_hybrid_bm25_search_uses_chunk_cache(self):
+        """Test that BM25 hits are resolved from the chunk cache, skipping ids Milvus doesn't know."""
+        chunks = _make_chunks()
+        milvus = FakeMilvusClient(chunks[:3])
+        hybrid = HybridSearch(milvus_client=milvus, graph_client=None, embedding_service=None)
+        hybrid.bm25_search.index_chunks(chunks)
+        hybrid.chunk_cache = {chunk.id: chunk for chunk in chunks if chunk.id != "chunk_3"}
+        
+        results = hybrid._bm25_search("load_yaml database", top_k=2)
+        
+        assert [r.chunk.id for r in results] == ["chunk_0"]
+        assert milvus.loaded_ids == [["chunk_3"]]
+        assert results[0].chunk is chunks[0]
+        assert results[0].rank == 1
+        assert results[0].search_type == "bm25"
+    
+    def test_hybrid_persists_bm25_index_and_hydrates_from_milvus(self, tmp_path: Path):
+        """Test that a restarted HybridSearch loads the saved index and fetches hit chunks from Milvus."""
+        chunks = _make_chunks()
+        index_path = str(tmp_path / "bm25")
+        hybrid = HybridSearch(milvus_client=None, graph_client=None, embedding_service=None,
+                              bm25_index_path=index_path)
+        hybrid.bm25_search.index_chunks(chunks)
+        hybrid._save_bm25_index()
+        
+        milvus = FakeMilvusClient(chunks)
+        restarted = HybridSearch(milvus_client=milvus, graph_client=None, embedding_service=None,
+                                 bm25_index_path=index_path)
+        results = restarted._bm25_search("load_yaml database", top_k=2)
+        
+        assert restarted.bm25_search.get_stats() == hybrid.bm25_search.get_stats()
+        assert {r.chunk.id for r in results} == {"chunk_0", "chunk_3"}
+        assert len(milvus.loaded_ids) == 1
+        assert set(restarted.chunk_cache) == {"chunk_0", "chunk_3"}
+    
+    def test_hybrid_combine_loads_only_top_k_vector_hits(self):
+        """Test that vector hits are loaded from Milvus only once they make the top-k."""
+        chunks = _make_chunks()
+        milvus = FakeMilvusClient(chunks)
+        hybrid = HybridSearch(milvus_client=milvus, graph_client=None, embedding_service=None)
+        hybrid.chunk_cache = {"chunk_0": chunks[0]}
+        vector_hits = [SearchHit(id=f"chunk_{i}", score=score) for i, score in enumerate([0.9, 0.8, 0.2, 0.1])]
+        
+        results = asyncio.run(hybrid._combine_results(vector_hits, [], 1.0, 0.0, top_k=2))
+        
+        assert [r.chunk.id for r in results] == ["chunk_0", "chunk_1"]
+        assert [r.rank for r in results] == [1, 2]
+        assert milvus.loaded_ids == [["chunk_1"]]
+    
+    def test_hybrid_combine_falls_back_to_bm25_when_chunk_load_fails(self):
+        """Test that a Milvus error while loading chunks falls back to the BM25 results."""
+        chunks = _make_chunks()
+        milvus = FakeMilvusClient(chunks)
+        
+        def fail(chunk_ids):
+            raise RuntimeError("milvus unavailable")
+        
+        milvus.get_chunks_by_ids = fail
+        hybrid = HybridSearch(milvus_client=milvus, graph_client=None, embedding_service=None)
+        vector_hits = [SearchHit(id="chunk_1", score=0.9)]
+        bm25_results = [SearchResult(chunk=chunks[0], score=2.0, rank=1, search_type="bm25", metadata={})]
+        
+        results = asyncio.run(hybrid._combine_results(vector_hits, bm25_results, 0.6, 0.4, top_k=2))
+        
+        assert [r.chunk.id for r in results] == ["chunk_0"]
+        assert results[0].metadata["search_types"] == ["bm25"]
@@ -1,38 +1,19 @@
+from __future__ import annotations
+
+import dataclasses
+from operator import attrgetter
 import pytest
 from pathlib import Path
-import sys
-
-# Add src to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+from typing import Any, Dict, Generator, List, Optional, TYPE_CHECKING
 
-from src.processor.content_processor import ContentProcessor, ASTParser
-from src.types import CodeFile, FileType
+from src.types import CodeChunk, CodeFile, FileType
 
+if TYPE_CHECKING:
+    from src.processor.ast_cache import ASTCache
+    from src.processor.content_processor import ContentProcessor, ASTParser
 
-class TestASTParser:
-    """Test AST parser functionality."""
-    
-    def test_ast_parser_initialization(self):
-        """Test AST parser initialization."""
-        parser = ASTParser()
-        
-        # Check that parsers were initialized
-        assert hasattr(parser, 'parsers')
-        assert isinstance(parser.parsers, dict)
-        
-        # Should have Python parser at minimum
-        if parser.parsers:
-            print(f"Available parsers: {list(parser.parsers.keys())}")
-        
-    def test_parse_python_code(self):
-        """Test parsing Python code."""
-        parser = ASTParser()
-        
-        # Skip if Python parser not available
-        if 'python' not in parser.parsers:
-            pytest.skip("Python parser not available")
-            
-        python_code = """
+# Python source with functions, a class and methods, shared by the parser tests
+PYTHON_SAMPLE = """
 def hello_world():
     print("Hello, World!")
     return True
@@ -49,8 +30,67 @@ def main():
     print(test.greet())
     hello_world()
 """
+
+
+# Metadata keys every AST chunk must carry
+REQUIRED_CHUNK_METADATA = frozenset({'file_size', 'file_type', 'ast_node_type'})
+
+# Code file with the fields every test file shares; copy it with _make_file
+_CODE_FILE_TEMPLATE = CodeFile(
+    path="",
+    absolute_path="",
+    file_type=FileType.CODE,
+    language=None,
+    size=0,
+    last_modified=0.0,
+    content="",
+)
+
+
+def _make_file(path: str, language: Optional[str], content: str) -> CodeFile:
+    """Create a code file under /tmp from the shared template."""
+    return dataclasses.replace(
+        _CODE_FILE_TEMPLATE,
+        path=path,
+        absolute_path=f"/tmp/{path}",
+        language=language,
+        size=len(content),
+        content=content,
+    )
+
+
+@pytest.fixture(scope="module")
+def ast_parser() -> ASTParser:
+    """Create one AST parser shared by the tests in this module."""
+    # Imported here so collection doesn't load tree-sitter and langchain
+    from src.processor.content_processor import ASTParser
+    
+    return ASTParser()
+
+
+@pytest.fixture(scope="module")
+def parsed_python_sample(ast_parser: ASTParser) -> List[Dict[str, Any]]:
+    """Parse PYTHON_SAMPLE once for every test that inspects its AST nodes."""
+    return ast_parser.parse_code(PYTHON_SAMPLE, 'python')
+
+
+class TestASTParser:
+    """Test AST parser functionality."""
+    
+    def test_ast_parser_initialization(self, ast_parser: ASTParser):
+        """Test AST parser initialization."""
+        # Check that parsers were initialized
+        assert hasattr(ast_parser, 'parsers')
+        assert isinstance(ast_parser.parsers, dict)
         
-        nodes = parser.parse_code(python_code, 'python')
+        # Should have Python parser at minimum
+        if ast_parser.parsers:
+            print(f"Available parsers: {list(ast_parser.parsers.keys())}")
+        
+    @pytest.mark.requires_language("python")
+    def test_parse_python_code(self, parsed_python_sample: List[Dict[str, Any]]):
+        """Test parsing Python code."""
+        nodes = parsed_python_sample
         
         # Should find function and class definitions
         assert len(nodes) > 0
@@ -69,24 +109,31 @@ def main():
             assert 'content' in node
             assert node['start_line'] <= node['end_line']
             
-    def test_parse_unsupported_language(self):
+    def test_parse_unsupported_language(self, ast_parser: ASTParser):
         """Test parsing unsupported language."""
-        parser = ASTParser()
-        
         code = "int main() { return 0; }"
-        nodes = parser.parse_code(code, 'unsupported_language')
+        nodes = ast_parser.parse_code(code, 'unsupported_language')
         
         # Should return empty list for unsupported languages
         assert nodes == []
         
-    def test_parse_invalid_syntax(self):
-        """Test parsing code with invalid syntax."""
-        parser = ASTParser()
+    def test_stdlib_python_parser(self):
+        """Test that the standard library fallback finds nodes in tree-sitter's order."""
+        from src.processor.content_processor import PythonStdlibParser
         
-        # Skip if Python parser not available
-        if 'python' not in parser.parsers:
-            pytest.skip("Python parser not available")
-            
+        code = "@decorator\ndef outer():\n    pass\n\nclass Outer:\n    async def method(self):\n        pass\n"
+        nodes = PythonStdlibParser().extract_nodes(code)
+        
+        assert [(n['type'], n['start_line'], n['end_line']) for n in nodes] == [
+            ('function_definition', 2, 3),
+            ('class_definition', 5, 7),
+            ('function_definition', 6, 7),
+        ]
+        assert nodes[2]['content'] == ["    async def method(self):", "        pass"]
+    
+    @pytest.mark.requires_language("python")
+    def test_parse_invalid_syntax(self, ast_parser: ASTParser):
+        """Test parsing code with invalid syntax."""
         invalid_code = """
 def invalid_function(
     # Missing closing parenthesis and colon
@@ -94,126 +141,73 @@ def invalid_function(
 """
         
         # Should handle errors gracefully
-        nodes = parser.parse_code(invalid_code, 'python')
+        nodes = ast_parser.parse_code(invalid_code, 'python')
         assert isinstance(nodes, list)  # Should return empty list, not crash
 
 
 class TestContentProcessor:
     """Test content processor functionality."""
     
-    def test_processor_initialization(self):
+    def test_processor_initialization(self, content_processor: ContentProcessor):
         """Test content processor initialization."""
-        processor = ContentProcessor()
+        from src.processor.content_processor import ASTParser
         
-        assert hasattr(processor, 'ast_parser')
-        assert hasattr(processor, 'text_splitter')
-        assert isinstance(processor.ast_parser, ASTParser)
+        assert hasattr(content_processor, 'ast_parser')
+        assert hasattr(content_processor, 'text_splitter')
+        assert isinstance(content_processor.ast_parser, ASTParser)
         
+    @pytest.mark.requires_language("python")
     def test_process_file_with_ast(self, content_processor: ContentProcessor, sample_code_file):
         """Test processing file with AST parser."""
-        # Skip if no AST parsers available
-        if not content_processor.ast_parser.parsers:
-            pytest.skip("No AST parsers available")
-            
-        # Skip if Python parser specifically not available
-        if 'python' not in content_processor.ast_parser.parsers:
-            pytest.skip("Python AST parser not available")
-            
         chunks = content_processor.process_file(sample_code_file)
         
         # Should return chunks (may be empty if no AST nodes found)
         assert isinstance(chunks, list)
         
-        if chunks:
-            # Verify chunk structure
-            for chunk in chunks:
-                assert hasattr(chunk, 'id')
-                assert hasattr(chunk, 'file_path')
-                assert hasattr(chunk, 'content')
-                assert hasattr(chunk, 'start_line')
-                assert hasattr(chunk, 'end_line')
-                assert hasattr(chunk, 'language')
-                assert hasattr(chunk, 'chunk_type')
-                assert hasattr(chunk, 'metadata')
-                
-                # Verify metadata structure
-                assert 'file_size' in chunk.metadata
-                assert 'file_type' in chunk.metadata
-                assert 'ast_node_type' in chunk.metadata
-                
-                # Verify line numbers are reasonable
-                assert chunk.start_line > 0
-                assert chunk.end_line >= chunk.start_line
-                
-                # Verify content is not empty
-                assert len(chunk.content.strip()) > 0
-                
-    def test_process_file_unsupported_language(self, content_processor: ContentProcessor):
-        """Test processing file with unsupported language."""
-        unsupported_file = CodeFile(
-            path="test.unknown",
-            absolute_path="/tmp/test.unknown",
-            file_type=FileType.CODE,
-            language="unknown_language",
-            size=100,
-            last_modified=0.0,
-            content="some content here"
-        )
+        # Verify chunk structure; CodeChunk is a slotted dataclass, so every field is present
+        assert all(isinstance(chunk, CodeChunk) for chunk in chunks)
         
-        chunks = content_processor.process_file(unsupported_file)
+        # Verify metadata structure
+        assert all(REQUIRED_CHUNK_METADATA <= chunk.metadata.keys() for chunk in chunks)
         
-        # Should return empty list (file skipped)
-        assert chunks == []
+        # Verify line numbers are reasonable
+        spans = list(map(attrgetter('start_line', 'end_line'), chunks))
+        assert all(0 < start <= end for start, end in spans)
         
-    def test_process_file_no_language(self, content_processor: ContentProcessor):
-        """Test processing file with no language detected."""
-        no_lang_file = CodeFile(
-            path="test.unknown",
-            absolute_path="/tmp/test.unknown",
-            file_type=FileType.CODE,
-            language=None,
-            size=100,
-            last_modified=0.0,
-            content="some content here"
-        )
+        # Verify content is not empty
+        assert all(chunk.content.strip() for chunk in chunks)
         
-        chunks = content_processor.process_file(no_lang_file)
+    @pytest.mark.requires_language("python")
+    def test_chunks_have_own_metadata(self, content_processor: ContentProcessor):
+        """Test that chunks of the same node type don't share a metadata dict."""
+        code_file = _make_file("two.py", "python", "def first():\n    pass\n\ndef second():\n    pass\n")
         
-        # Should return empty list (file skipped)
-        assert chunks == []
+        first, second = content_processor.process_file(code_file)
+        first.metadata['tag'] = 'first'
         
-    def test_process_file_empty_content(self, content_processor: ContentProcessor):
-        """Test processing file with empty content."""
-        empty_file = CodeFile(
-            path="empty.py",
-            absolute_path="/tmp/empty.py",
-            file_type=FileType.CODE,
-            language="python",
-            size=0,
-            last_modified=0.0,
-            content=""
-        )
+        assert 'tag' not in second.metadata
+        
+    @pytest.mark.parametrize("path,language,content", [
+        ("test.unknown", "unknown_language", "some content here"),
+        ("test.unknown", None, "some content here"),
+        ("empty.py", "python", ""),
+        # Language that might not have AST support: no fallback to the text splitter
+        ("test.xyz", "xyz_language", "function test() { return 42; }"),
+    ], ids=["unsupported_language", "no_language", "empty_content", "no_ast_support"])
+    def test_process_file_skipped(self, content_processor: ContentProcessor,
+                                  path: str, language: Optional[str], content: str):
+        """Test files without a usable language or content are skipped."""
+        skipped_file = _make_file(path, language, content)
         
-        chunks = content_processor.process_file(empty_file)
+        chunks = content_processor.process_file(skipped_file)
         
-        # Should return empty list
+        # Should return empty list (file skipped)
         assert chunks == []
         
+    @pytest.mark.requires_language("python")
     def test_process_file_no_ast_nodes(self, content_processor: ContentProcessor):
         """Test processing file that produces no AST nodes."""
-        # Skip if Python parser not available
-        if 'python' not in content_processor.ast_parser.parsers:
-            pytest.skip("Python AST parser not available")
-            
-        comment_only_file = CodeFile(
-            path="comments.py",
-            absolute_path="/tmp/comments.py",
-            file_type=FileType.CODE,
-            language="python",
-            size=50,
-            last_modified=0.0,
-            content="# Just a comment\n# Another comment\n"
-        )
+        comment_only_file = _make_file("comments.py", "python", "# Just a comment\n# Another comment\n")
         
         chunks = content_processor.process_file(comment_only_file)
         
@@ -226,37 +220,13 @@ class TestContentProcessor:
         
         # Only create files for available parsers
         if 'python' in content_processor.ast_parser.parsers:
-            files.append(CodeFile(
-                path="test1.py",
-                absolute_path="/tmp/test1.py",
-                file_type=FileType.CODE,
-                language="python",
-                size=100,
-                last_modified=0.0,
-                content="def test1():\n    pass\n"
-            ))
+            files.append(_make_file("test1.py", "python", "def test1():\n    pass\n"))
             
         if 'javascript' in content_processor.ast_parser.parsers:
-            files.append(CodeFile(
-                path="test2.js",
-                absolute_path="/tmp/test2.js",
-                file_type=FileType.CODE,
-                language="javascript",
-                size=100,
-                last_modified=0.0,
-                content="function test2() {\n    return true;\n}\n"
-            ))
+            files.append(_make_file("test2.js", "javascript", "function test2() {\n    return true;\n}\n"))
         
         # Add unsupported file (should be skipped)
-        files.append(CodeFile(
-            path="test3.unknown",
-            absolute_path="/tmp/test3.unknown",
-            file_type=FileType.CODE,
-            language="unknown",
-            size=100,
-            last_modified=0.0,
-            content="unknown content"
-        ))
+        files.append(_make_file("test3.unknown", "unknown", "unknown content"))
         
         if not files:
             pytest.skip("No supported languages available")
@@ -272,37 +242,21 @@ class TestContentProcessor:
         
     def test_chunk_id_generation(self, content_processor: ContentProcessor):
         """Test chunk ID generation."""
-        # Test that IDs are unique and consistent
-        id1 = content_processor._generate_chunk_id("test.py", 1, 10)
-        id2 = content_processor._generate_chunk_id("test.py", 1, 10)
-        id3 = content_processor._generate_chunk_id("test.py", 2, 10)
-        
-        # Same parameters should generate same ID
-        assert id1 == id2
-        
-        # Different parameters should generate different ID
-        assert id1 != id3
+        # Same parameters should generate same ID, different parameters a different ID
+        id1, id2, id3 = (
+            content_processor._generate_chunk_id(*span)
+            for span in (("test.py", 1, 10), ("test.py", 1, 10), ("test.py", 2, 10))
+        )
+        assert id1 == id2 != id3
         
-        # IDs should be valid strings
-        assert isinstance(id1, str)
-        assert len(id1) > 0
+        # IDs should be valid, non-empty strings
+        assert all(isinstance(chunk_id, str) and chunk_id for chunk_id in (id1, id3))
         
+    @pytest.mark.requires_language("python")
     def test_ast_error_handling(self, content_processor: ContentProcessor):
         """Test AST parser error handling."""
-        # Skip if Python parser not available
-        if 'python' not in content_processor.ast_parser.parsers:
-            pytest.skip("Python AST parser not available")
-            
         # File with syntax errors that might break AST parsing
-        problematic_file = CodeFile(
-            path="problematic.py",
-            absolute_path="/tmp/problematic.py",
-            file_type=FileType.CODE,
-            language="python",
-            size=100,
-            last_modified=0.0,
-            content="def broken(\n    # incomplete function definition"
-        )
+        problematic_file = _make_file("problematic.py", "python", "def broken(\n    # incomplete function definition")
         
         # Should handle errors gracefully and return empty list
         chunks = content_processor.process_file(problematic_file)
@@ -310,24 +264,92 @@ class TestContentProcessor:
         
     def test_force_ast_usage_setting(self, content_processor: ContentProcessor):
         """Test that processor enforces AST-only usage."""
-        # This test verifies the behavioral change where text splitter fallback is removed
-        
-        # Create a file for a language that might not have AST support
-        unsupported_file = CodeFile(
-            path="test.xyz",
-            absolute_path="/tmp/test.xyz",
-            file_type=FileType.CODE,
-            language="xyz_language",
-            size=100,
-            last_modified=0.0,
-            content="function test() { return 42; }"
+        # This test verifies the behavioral change where text splitter fallback is removed;
+        # unsupported languages returning no chunks is covered by test_process_file_skipped
+        
+        # Verify that process_file method doesn't call text splitter methods
+        assert '_process_with_text_splitter' not in content_processor.process_file.__code__.co_names
+
+
+class TestASTCache:
+    """Test the persistent AST chunk cache."""
+    
+    BACKEND = "stdlib-ast-test"
+    
+    @pytest.fixture
+    def ast_cache(self, tmp_path: Path) -> Generator[ASTCache, None, None]:
+        """Create an AST cache in a temporary directory."""
+        from src.processor.ast_cache import ASTCache
+        
+        cache = ASTCache(str(tmp_path / "ast_cache.sqlite"))
+        yield cache
+        cache.close()
+    
+    @staticmethod
+    def _chunk(code_file: CodeFile) -> CodeChunk:
+        return CodeChunk(
+            id="cached_chunk",
+            file_path=code_file.path,
+            content=code_file.content,
+            start_line=1,
+            end_line=2,
+            language=code_file.language,
+            chunk_type="function_definition",
+            metadata={'file_size': code_file.size, 'file_type': code_file.file_type.value,
+                      'ast_node_type': "function_definition"},
         )
+    
+    def test_round_trip(self, ast_cache: ASTCache):
+        """Test stored chunks come back unchanged, including empty results."""
+        code_file = _make_file("cached.py", "python", "def cached():\n    pass\n")
+        empty_file = _make_file("comments.py", "python", "# Just a comment\n")
         
-        chunks = content_processor.process_file(unsupported_file)
+        assert ast_cache.get(code_file, self.BACKEND) is None
         
-        # Should return empty list instead of falling back to text splitter
-        assert chunks == []
+        ast_cache.put(code_file, self.BACKEND, [self._chunk(code_file)])
+        ast_cache.put(empty_file, self.BACKEND, [])
         
-        # Verify that process_file method doesn't call text splitter methods
-        assert not hasattr(content_processor, '_process_with_text_splitter') or \
-               '_process_with_text_splitter' not in str(content_processor.process_file.__code__.co_names) 
\ No newline at end of file
+        assert ast_cache.get(code_file, self.BACKEND) == [self._chunk(code_file)]
+        assert ast_cache.get(empty_file, self.BACKEND) == []
+    
+    def test_changed_content_misses(self, ast_cache: ASTCache):
+        """Test that editing a file or changing its parser backend invalidates its cached chunks."""
+        code_file = _make_file("cached.py", "python", "def cached():\n    pass\n")
+        ast_cache.put(code_file, self.BACKEND, [self._chunk(code_file)])
+        
+        edited_file = _make_file("cached.py", "python", "def cached():\n    return 1\n")
+        moved_file = _make_file("moved.py", "python", code_file.content)
+        
+        assert ast_cache.get(edited_file, self.BACKEND) is None
+        assert ast_cache.get(moved_file, self.BACKEND) is None
+        assert ast_cache.get(code_file, "tree-sitter-test") is None
+    
+    def test_processor_parses_each_file_once(self, ast_cache: ASTCache, monkeypatch: pytest.MonkeyPatch):
+        """Test that the processor reuses cached chunks instead of parsing again."""
+        from src.processor.content_processor import ContentProcessor
+        
+        processor = ContentProcessor(ast_cache=ast_cache)
+        monkeypatch.setitem(processor.ast_parser.parsers, "python", object())
+        
+        code_file = _make_file("cached.py", "python", "def cached():\n    pass\n")
+        calls = []
+        
+        def fake_process_with_ast(processed_file: CodeFile) -> List[CodeChunk]:
+            calls.append(processed_file.path)
+            return [self._chunk(processed_file)]
+        
+        monkeypatch.setattr(processor, "_process_with_ast", fake_process_with_ast)
+        
+        first = processor.process_file(code_file)
+        second = processor.process_file(code_file)
+        
+        assert first == second == [self._chunk(code_file)]
+        assert calls == ["cached.py"]
+    
+    def test_database_errors_are_treated_as_misses(self, ast_cache: ASTCache):
+        """Test that sqlite errors make get miss and put skip the write instead of raising."""
+        code_file = _make_file("cached.py", "python", "def cached():\n    pass\n")
+        ast_cache.close()
+        
+        ast_cache.put(code_file, self.BACKEND, [self._chunk(code_file)])
+        assert ast_cache.get(code_file, self.BACKEND) is None
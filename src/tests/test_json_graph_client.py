@@ -1,40 +1,67 @@
 import pytest
 from typing import Dict, Any
-import sys
-import os
-from pathlib import Path
-
-# Add src to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 from src.types import CodeChunk, FileType
 from src.graph.json_graph_client import JsonGraphClient
 
+# Ids in the populated_graph_client graph
+POPULATED_FILE = "graph_test.py"
+POPULATED_CHUNKS = ("hello_chunk", "goodbye_chunk")
+POPULATED_CALLER = "graph_test.py::hello_world"
+POPULATED_CALLEE = "graph_test.py::goodbye"
+POPULATED_PARENT = "graph_test.py::ParentClass"
+POPULATED_CHILD = "graph_test.py::ChildClass"
 
-class TestJsonGraphClient:
-    """Test JSON graph client functionality."""
+
+@pytest.fixture(scope="module")
+def populated_graph_client(tmp_path_factory, sample_metadata: Dict[str, Any]) -> JsonGraphClient:
+    """JSON graph client holding a small representative graph, built once per module.
     
-    def setup_method(self):
-        """Set up test environment."""
-        self.test_graph_path = "test_graph_data.json"
-        self.client = JsonGraphClient(self.test_graph_path)
+    Holds a file with two chunks, a calling function pair and a class pair. Tests that
+    use it only read; tests that write use graph_client instead.
+    """
+    client = JsonGraphClient(str(tmp_path_factory.mktemp("graph") / "graph_data.json"))
+    
+    with client.bulk():
+        client.create_file_node(POPULATED_FILE, "python", "code", sample_metadata)
+        
+        contents = ("def hello_world():\n    print('Hello World')", "def goodbye():\n    print('Goodbye')")
+        for index, (chunk_id, content) in enumerate(zip(POPULATED_CHUNKS, contents)):
+            client.create_chunk_node(CodeChunk(
+                id=chunk_id,
+                file_path=POPULATED_FILE,
+                content=content,
+                start_line=index * 2 + 1,
+                end_line=index * 2 + 2,
+                language="python",
+                chunk_type="function_definition",
+                metadata=sample_metadata
+            ))
+            client.create_file_chunk_relationship(POPULATED_FILE, chunk_id)
+        
+        client.create_function_node("hello_world", POPULATED_CALLER, POPULATED_FILE, 1, sample_metadata)
+        client.create_function_node("goodbye", POPULATED_CALLEE, POPULATED_FILE, 3, sample_metadata)
+        client.create_function_chunk_relationship(POPULATED_CALLER, POPULATED_CHUNKS[0])
+        client.create_function_call_relationship(POPULATED_CALLER, POPULATED_CALLEE)
+        
+        client.create_class_node("ParentClass", POPULATED_PARENT, POPULATED_FILE, 5, sample_metadata)
+        client.create_class_node("ChildClass", POPULATED_CHILD, POPULATED_FILE, 9, sample_metadata)
+        client.create_class_inheritance_relationship(POPULATED_CHILD, POPULATED_PARENT)
     
-    def teardown_method(self):
-        """Clean up test environment."""
-        # Clear the test database
-        self.client.clear_database()
-        # Remove test file if it exists
-        if os.path.exists(self.test_graph_path):
-            os.remove(self.test_graph_path)
+    return client
+
+
+class TestJsonGraphClient:
+    """Test JSON graph client functionality."""
     
-    def test_create_file_node(self, sample_metadata: Dict[str, Any]):
+    def test_create_file_node(self, graph_client: JsonGraphClient, sample_metadata: Dict[str, Any]):
         """Test creating file node with metadata."""
         file_path = "src/scanner/local_codebase_scanner.py"
         language = "python"
         file_type = "code"
         
         # This should not raise the previous TypeError about Map objects
-        node = self.client.create_file_node(
+        node = graph_client.create_file_node(
             file_path=file_path,
             language=language,
             file_type=file_type,
@@ -49,7 +76,7 @@ class TestJsonGraphClient:
         assert node.properties["language"] == language
         assert node.properties["file_type"] == file_type
     
-    def test_create_chunk_node(self, sample_metadata: Dict[str, Any]):
+    def test_create_chunk_node(self, graph_client: JsonGraphClient, sample_metadata: Dict[str, Any]):
         """Test creating chunk node with metadata."""
         chunk = CodeChunk(
             id="test_chunk_001",
@@ -63,7 +90,7 @@ class TestJsonGraphClient:
         )
         
         # This should not raise TypeError about Map objects
-        node = self.client.create_chunk_node(chunk)
+        node = graph_client.create_chunk_node(chunk)
         
         assert node is not None
         assert node.id == chunk.id
@@ -74,14 +101,14 @@ class TestJsonGraphClient:
         assert "chunk_index" in node.properties
         assert "ast_node_type" in node.properties
     
-    def test_create_function_node(self, sample_metadata: Dict[str, Any]):
+    def test_create_function_node(self, graph_client: JsonGraphClient, sample_metadata: Dict[str, Any]):
         """Test creating function node."""
         name = "test_function"
         qualified_name = "module.test_function"
         file_path = "test_file.py"
         line_number = 10
         
-        node = self.client.create_function_node(
+        node = graph_client.create_function_node(
             name=name,
             qualified_name=qualified_name,
             file_path=file_path,
@@ -96,14 +123,14 @@ class TestJsonGraphClient:
         assert node.line_number == line_number
         assert node.properties["name"] == name
     
-    def test_create_class_node(self, sample_metadata: Dict[str, Any]):
+    def test_create_class_node(self, graph_client: JsonGraphClient, sample_metadata: Dict[str, Any]):
         """Test creating class node."""
         name = "TestClass"
         qualified_name = "module.TestClass"
         file_path = "test_file.py"
         line_number = 5
         
-        node = self.client.create_class_node(
+        node = graph_client.create_class_node(
             name=name,
             qualified_name=qualified_name,
             file_path=file_path,
@@ -118,103 +145,61 @@ class TestJsonGraphClient:
         assert node.line_number == line_number
         assert node.properties["name"] == name
     
-    def test_create_relationships(self, sample_metadata: Dict[str, Any]):
+    def test_create_relationships(self, graph_client: JsonGraphClient, sample_metadata: Dict[str, Any]):
         """Test creating relationships between nodes."""
-        # Create file node
-        file_path = "test_relationships.py"
-        file_node = self.client.create_file_node(
-            file_path=file_path,
-            language="python",
-            file_type="code",
-            metadata=sample_metadata
-        )
-        
-        # Create chunk node
-        chunk = CodeChunk(
-            id="test_chunk_rel",
-            file_path=file_path,
-            content="def test():\n    pass",
-            start_line=1,
-            end_line=2,
-            language="python",
-            chunk_type="function_definition",
-            metadata=sample_metadata
-        )
-        chunk_node = self.client.create_chunk_node(chunk)
-        
-        # Create file-chunk relationship
-        edge = self.client.create_file_chunk_relationship(file_path, chunk.id)
-        
-        assert edge is not None
-        assert edge.source_id == file_path
-        assert edge.target_id == chunk.id
-        assert edge.relationship_type == "CONTAINS"
-    
-    def test_search_by_text(self, sample_metadata: Dict[str, Any]):
-        """Test text search functionality."""
-        # Create some chunks with different content
-        chunks = [
-            CodeChunk(
-                id="search_chunk_1",
-                file_path="search_test.py",
-                content="def hello_world():\n    print('Hello World')",
-                start_line=1,
-                end_line=2,
+        with graph_client.bulk():
+            # Create file node
+            file_path = "test_relationships.py"
+            file_node = graph_client.create_file_node(
+                file_path=file_path,
                 language="python",
-                chunk_type="function_definition",
+                file_type="code",
                 metadata=sample_metadata
-            ),
-            CodeChunk(
-                id="search_chunk_2",
-                file_path="search_test.py",
-                content="def goodbye():\n    print('Goodbye')",
-                start_line=3,
-                end_line=4,
+            )
+            
+            # Create chunk node
+            chunk = CodeChunk(
+                id="test_chunk_rel",
+                file_path=file_path,
+                content="def test():\n    pass",
+                start_line=1,
+                end_line=2,
                 language="python",
                 chunk_type="function_definition",
                 metadata=sample_metadata
             )
-        ]
+            chunk_node = graph_client.create_chunk_node(chunk)
+            
+            # Create file-chunk relationship
+            edge = graph_client.create_file_chunk_relationship(file_path, chunk.id)
         
-        # Insert chunks
-        for chunk in chunks:
-            self.client.create_chunk_node(chunk)
-        
-        # Search for specific text
-        results = self.client.search_by_text("Hello World", limit=5)
+        assert edge is not None
+        assert edge.source_id == file_path
+        assert edge.target_id == chunk.id
+        assert edge.relationship_type == "CONTAINS"
+    
+    def test_search_by_text(self, populated_graph_client: JsonGraphClient):
+        """Test text search functionality."""
+        results = populated_graph_client.search_by_text("Hello World", limit=5)
         
         assert len(results) >= 1
         assert any("Hello World" in node.properties.get("content", "") for node in results)
+        assert all(node.type == "Chunk" for node in results)
     
-    def test_database_stats(self, sample_metadata: Dict[str, Any]):
+    def test_database_stats(self, populated_graph_client: JsonGraphClient):
         """Test database statistics."""
-        # Create some test data
-        self.client.create_file_node("stats_test.py", "python", "code", sample_metadata)
-        
-        chunk = CodeChunk(
-            id="stats_chunk",
-            file_path="stats_test.py",
-            content="def stats_test():\n    pass",
-            start_line=1,
-            end_line=2,
-            language="python",
-            chunk_type="function_definition",
-            metadata=sample_metadata
-        )
-        self.client.create_chunk_node(chunk)
-        
-        # Get stats
-        stats = self.client.get_database_stats()
+        stats = populated_graph_client.get_database_stats()
         
         assert "nodes" in stats
         assert "relationships" in stats
         assert isinstance(stats["nodes"], dict)
         assert isinstance(stats["relationships"], dict)
+        assert stats["nodes"] == {"File": 1, "Chunk": 2, "Function": 2, "Class": 2}
     
-    def test_metadata_handling_edge_cases(self):
+    def test_metadata_handling_edge_cases(self, graph_client: JsonGraphClient):
         """Test metadata handling with edge cases."""
         # Test with None metadata
-        node1 = self.client.create_file_node(
+        node1 = graph_client.create_file_node(
             file_path="test_none_metadata.py",
             language="python",
             file_type="code",
@@ -223,7 +208,7 @@ class TestJsonGraphClient:
         assert node1 is not None
         
         # Test with empty metadata
-        node2 = self.client.create_file_node(
+        node2 = graph_client.create_file_node(
             file_path="test_empty_metadata.py",
             language="python",
             file_type="code",
@@ -242,47 +227,28 @@ class TestJsonGraphClient:
             chunk_type="function_definition",
             metadata=None
         )
-        chunk_node = self.client.create_chunk_node(chunk)
+        chunk_node = graph_client.create_chunk_node(chunk)
         assert chunk_node is not None
     
-    def test_clear_database(self, sample_metadata: Dict[str, Any]):
+    def test_clear_database(self, graph_client: JsonGraphClient, sample_metadata: Dict[str, Any]):
         """Test clearing database."""
         # Create some test data
-        self.client.create_file_node("clear_test.py", "python", "code", sample_metadata)
+        graph_client.create_file_node("clear_test.py", "python", "code", sample_metadata)
         
         # Clear database
-        self.client.clear_database()
+        graph_client.clear_database()
         
         # Verify data is cleared
-        stats = self.client.get_database_stats()
+        stats = graph_client.get_database_stats()
         total_nodes = sum(stats["nodes"].values()) if stats["nodes"] else 0
         total_relationships = sum(stats["relationships"].values()) if stats["relationships"] else 0
         
         assert total_nodes == 0
         assert total_relationships == 0
     
-    def test_graph_data_retrieval(self, sample_metadata: Dict[str, Any]):
+    def test_graph_data_retrieval(self, populated_graph_client: JsonGraphClient):
         """Test retrieving complete graph data."""
-        # Create test data
-        self.client.create_file_node("graph_test.py", "python", "code", sample_metadata)
-        
-        chunk = CodeChunk(
-            id="graph_chunk",
-            file_path="graph_test.py",
-            content="def graph_test():\n    pass",
-            start_line=1,
-            end_line=2,
-            language="python",
-            chunk_type="function_definition",
-            metadata=sample_metadata
-        )
-        self.client.create_chunk_node(chunk)
-        
-        # Create relationship
-        self.client.create_file_chunk_relationship("graph_test.py", "graph_chunk")
-        
-        # Get graph data
-        graph_data = self.client.get_graph_data()
+        graph_data = populated_graph_client.get_graph_data()
         
         assert "nodes" in graph_data
         assert "edges" in graph_data
@@ -290,139 +256,90 @@ class TestJsonGraphClient:
         assert len(graph_data["nodes"]) >= 2
         assert len(graph_data["edges"]) >= 1
     
-    def test_node_details(self, sample_metadata: Dict[str, Any]):
+    def test_node_details(self, populated_graph_client: JsonGraphClient):
         """Test getting node details."""
-        # Create test function node
-        func_name = "test_function"
-        qualified_name = "test.py::test_function"
-        
-        self.client.create_function_node(
-            name=func_name,
-            qualified_name=qualified_name,
-            file_path="test.py",
-            line_number=1,
-            metadata=sample_metadata
-        )
-        
-        # Get node details
-        details = self.client.get_node_details(qualified_name)
+        details = populated_graph_client.get_node_details(POPULATED_CALLER)
         
         assert details is not None
         assert "node" in details
         assert "related_edges" in details
         assert "related_nodes" in details
-        assert details["node"]["id"] == qualified_name
+        assert details["node"]["id"] == POPULATED_CALLER
         assert details["node"]["type"] == "Function"
     
-    def test_file_structure(self, sample_metadata: Dict[str, Any]):
+    def test_file_structure(self, populated_graph_client: JsonGraphClient):
         """Test getting file structure."""
-        file_path = "structure_test.py"
-        
-        # Create file node
-        self.client.create_file_node(file_path, "python", "code", sample_metadata)
-        
-        # Create function node
-        func_name = "test_func"
-        qualified_name = f"{file_path}::test_func"
-        self.client.create_function_node(
-            name=func_name,
-            qualified_name=qualified_name,
-            file_path=file_path,
-            line_number=1,
-            metadata=sample_metadata
-        )
-        
-        # Create chunk node
-        chunk = CodeChunk(
-            id="structure_chunk",
-            file_path=file_path,
-            content="def test_func():\n    pass",
-            start_line=1,
-            end_line=2,
-            language="python",
-            chunk_type="function_definition",
-            metadata=sample_metadata
-        )
-        self.client.create_chunk_node(chunk)
-        
-        # Create relationships
-        self.client.create_file_chunk_relationship(file_path, chunk.id)
-        self.client.create_function_chunk_relationship(qualified_name, chunk.id)
-        
-        # Get file structure
-        structure = self.client.get_file_structure(file_path)
+        structure = populated_graph_client.get_file_structure(POPULATED_FILE)
         
         assert structure.nodes is not None
         assert structure.edges is not None
         assert len(structure.nodes) >= 3  # file + function + chunk
         assert len(structure.edges) >= 2  # file-chunk + function-chunk
     
-    def test_function_dependencies(self, sample_metadata: Dict[str, Any]):
+    def test_function_dependencies(self, populated_graph_client: JsonGraphClient):
         """Test getting function dependencies."""
-        # Create caller function
-        caller_name = "caller_func"
-        caller_qualified = "test.py::caller_func"
-        self.client.create_function_node(
-            name=caller_name,
-            qualified_name=caller_qualified,
-            file_path="test.py",
-            line_number=1,
-            metadata=sample_metadata
-        )
-        
-        # Create callee function
-        callee_name = "callee_func"
-        callee_qualified = "test.py::callee_func"
-        self.client.create_function_node(
-            name=callee_name,
-            qualified_name=callee_qualified,
-            file_path="test.py",
-            line_number=5,
-            metadata=sample_metadata
-        )
-        
-        # Create call relationship
-        self.client.create_function_call_relationship(caller_qualified, callee_qualified)
-        
-        # Get dependencies
-        dependencies = self.client.find_function_dependencies(caller_qualified)
+        dependencies = populated_graph_client.find_function_dependencies(POPULATED_CALLER)
         
         assert dependencies.nodes is not None
         assert dependencies.edges is not None
         assert len(dependencies.nodes) >= 2  # caller + callee
         assert len(dependencies.edges) >= 1  # call relationship
     
-    def test_class_hierarchy(self, sample_metadata: Dict[str, Any]):
+    def test_class_hierarchy(self, populated_graph_client: JsonGraphClient):
         """Test getting class hierarchy."""
-        # Create parent class
-        parent_name = "ParentClass"
-        parent_qualified = "test.py::ParentClass"
-        self.client.create_class_node(
-            name=parent_name,
-            qualified_name=parent_qualified,
-            file_path="test.py",
-            line_number=1,
-            metadata=sample_metadata
-        )
-        
-        # Create child class
-        child_name = "ChildClass"
-        child_qualified = "test.py::ChildClass"
-        self.client.create_class_node(
-            name=child_name,
-            qualified_name=child_qualified,
-            file_path="test.py",
-            line_number=5,
-            metadata=sample_metadata
-        )
-        
-        # Create inheritance relationship
-        self.client.create_class_inheritance_relationship(child_qualified, parent_qualified)
-        
-        # Get hierarchy
-        hierarchy = self.client.find_class_hierarchy(child_qualified)
+        hierarchy = populated_graph_client.find_class_hierarchy(POPULATED_CHILD)
         
         assert hierarchy.nodes is not None
         assert hierarchy.edges is not None
         assert len(hierarchy.nodes) >= 2  # parent + child
-        assert len(hierarchy.edges) >= 1  # inheritance relationship
\ No newline at end of file
+        assert len(hierarchy.edges) >= 1  # inheritance relationship
+    
+    def test_find_related_chunks_batch(self, graph_client: JsonGraphClient, sample_metadata: Dict[str, Any]):
+        """Test batched related-chunk lookup."""
+        file_path = "batch_test.py"
+        with graph_client.bulk():
+            graph_client.create_file_node(file_path, "python", "code", sample_metadata)
+            
+            for i in range(3):
+                chunk = CodeChunk(
+                    id=f"batch_chunk_{i}",
+                    file_path=file_path,
+                    content=f"def batch_{i}():\n    pass",
+                    start_line=i * 2 + 1,
+                    end_line=i * 2 + 2,
+                    language="python",
+                    chunk_type="function_definition",
+                    metadata=sample_metadata
+                )
+                graph_client.create_chunk_node(chunk)
+                graph_client.create_file_chunk_relationship(file_path, chunk.id)
+        
+        chunk_ids = ["batch_chunk_0", "batch_chunk_1", "batch_chunk_2", "missing_chunk"]
+        batch = graph_client.find_related_chunks_batch(chunk_ids)
+        
+        assert set(batch) == set(chunk_ids) - {"missing_chunk"}
+        assert graph_client.find_related_chunks("missing_chunk").nodes == []
+        for chunk_id in batch:
+            single = graph_client.find_related_chunks(chunk_id)
+            assert [n.id for n in batch[chunk_id].nodes] == [n.id for n in single.nodes]
+            assert len(batch[chunk_id].edges) == len(single.edges)
+        assert {n.id for n in batch["batch_chunk_1"].nodes} == {file_path, "batch_chunk_1"}
+    
+    def test_bulk_defers_saving(self, graph_client: JsonGraphClient, sample_metadata: Dict[str, Any]):
+        """Test that writes inside bulk() are saved once, when the outermost block exits."""
+        with graph_client.bulk():
+            graph_client.create_file_node("bulk_test.py", "python", "code", sample_metadata)
+            with graph_client.bulk():
+                graph_client.create_function_node(
+                    name="bulk_func",
+                    qualified_name="bulk_test.py::bulk_func",
+                    file_path="bulk_test.py",
+                    line_number=1,
+                    metadata=sample_metadata
+                )
+            
+            # Nothing written yet, even after the inner block exits
+            assert not graph_client.storage_path.exists()
+        
+        reloaded = JsonGraphClient(str(graph_client.storage_path))
+        assert set(reloaded.data["nodes"]) == {"bulk_test.py", "bulk_test.py::bulk_func"}
@@ -0,0 +1,18 @@
+from pathlib import Path
+
+from src.scanner.local_codebase_scanner import LocalCodebaseScanner
+
+
+class TestLocalCodebaseScanner:
+    """Test local codebase scanner functionality."""
+    
+    def test_iter_load_matches_load_files_content(self, temp_codebase: Path, scanner: LocalCodebaseScanner):
+        """Test the streaming scan/load pipeline yields the same files as the list-based one."""
+        (temp_codebase / "empty.py").write_text("")
+        
+        loaded = scanner.load_files_content(scanner.scan_directory())
+        streamed = list(scanner.iter_load(scanner.iter_scan()))
+        
+        assert streamed
+        assert {f.path: f.content for f in streamed} == {f.path: f.content for f in loaded}
+        assert "empty.py" not in {f.path for f in streamed}
@@ -1,15 +1,22 @@
+from __future__ import annotations
+
 import pytest
 import numpy as np
-from typing import List
-import sys
-from pathlib import Path
-
-# Add src to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+from dataclasses import replace
+from typing import List, TYPE_CHECKING
 
-from src.query.milvus_client import MilvusClient
 from src.types import CodeChunk
 
+if TYPE_CHECKING:
+    from src.query.milvus_client import MilvusClient
+
+
+def _vector(*head: float) -> np.ndarray:
+    """Build a 768-dimensional float32 vector starting with the given values, zeros after."""
+    vector = np.zeros(768, dtype=np.float32)
+    vector[:len(head)] = head
+    return vector
+
 
 class TestMilvusClient:
     """Test Milvus client functionality."""
@@ -24,79 +31,64 @@ class TestMilvusClient:
         assert "name" in info
         assert "schema" in info
         
-    def test_insert_embeddings(self, milvus_client: MilvusClient, sample_code_file):
+    def test_insert_embeddings(self, milvus_client: MilvusClient, sample_code_file, chunk_template: CodeChunk):
         """Test inserting embeddings."""
         # Create sample chunks with embeddings
         chunks = [
-            CodeChunk(
+            replace(
+                chunk_template,
                 id="milvus_test_chunk_1",
                 file_path=sample_code_file.path,
                 content="def test_function_1():\n    return 'test1'",
-                start_line=1,
-                end_line=2,
-                language="python",
-                chunk_type="function_definition",
-                metadata={"file_size": 100},
-                embedding=[0.1, 0.2, 0.3] + [0.0] * 765  # 768-dimensional vector
+                embedding=_vector(0.1, 0.2, 0.3)  # 768-dimensional vector
             ),
-            CodeChunk(
+            replace(
+                chunk_template,
                 id="milvus_test_chunk_2",
                 file_path=sample_code_file.path,
                 content="def test_function_2():\n    return 'test2'",
                 start_line=3,
                 end_line=4,
-                language="python",
-                chunk_type="function_definition",
-                metadata={"file_size": 100},
-                embedding=[0.2, 0.3, 0.4] + [0.0] * 765  # 768-dimensional vector
+                embedding=_vector(0.2, 0.3, 0.4)  # 768-dimensional vector
             )
         ]
         
         # Insert chunks
-        result = milvus_client.insert_chunks(chunks)
+        # Strongly consistent reads see the rows without a flush
+        result = milvus_client.insert_chunks(chunks, flush=False)
         assert result is not None
         
-        # Flush to ensure data is persisted
-        milvus_client.flush()
-        
         # Verify insertion
         count = milvus_client.get_entity_count()
         assert count >= 2
         
-    def test_vector_search(self, milvus_client: MilvusClient, sample_code_file):
+    def test_vector_search(self, milvus_client: MilvusClient, sample_code_file, chunk_template: CodeChunk):
         """Test vector similarity search."""
         # Insert test data first
         chunks = [
-            CodeChunk(
+            replace(
+                chunk_template,
                 id="vector_search_chunk_1",
                 file_path=sample_code_file.path,
                 content="def search_test_1():\n    return 'search1'",
-                start_line=1,
-                end_line=2,
-                language="python",
-                chunk_type="function_definition",
-                metadata={"file_size": 100},
-                embedding=[1.0, 0.0, 0.0] + [0.0] * 765
+                embedding=_vector(1.0, 0.0, 0.0)
             ),
-            CodeChunk(
+            replace(
+                chunk_template,
                 id="vector_search_chunk_2",
                 file_path=sample_code_file.path,
                 content="def search_test_2():\n    return 'search2'",
                 start_line=3,
                 end_line=4,
-                language="python",
-                chunk_type="function_definition",
-                metadata={"file_size": 100},
-                embedding=[0.0, 1.0, 0.0] + [0.0] * 765
+                embedding=_vector(0.0, 1.0, 0.0)
             )
         ]
         
-        milvus_client.insert_chunks(chunks)
-        milvus_client.flush()
+        milvus_client.insert_chunks(chunks, flush=False)
         
         # Perform vector search
-        query_vector = [1.0, 0.0, 0.0] + [0.0] * 765
-        results = milvus_client.search_similar(query_vector, top_k=2)
+        query_vector = _vector(1.0, 0.0, 0.0)
+        results = milvus_client.search_similar(query_vector, top_k=2, consistency_level="Strong")
         
         assert len(results) > 0
         assert all(hasattr(result, 'id') for result in results)
@@ -106,96 +98,83 @@ class TestMilvusClient:
         if len(results) > 1:
             assert results[0].distance <= results[1].distance
             
-    def test_search_with_filters(self, milvus_client: MilvusClient, sample_code_file):
+    def test_search_with_filters(self, milvus_client: MilvusClient, sample_code_file, chunk_template: CodeChunk):
         """Test search with metadata filters."""
         # Insert test data with different languages
         chunks = [
-            CodeChunk(
+            replace(
+                chunk_template,
                 id="filter_test_py",
                 file_path="test.py",
                 content="def python_function():\n    pass",
-                start_line=1,
-                end_line=2,
-                language="python",
-                chunk_type="function_definition",
-                metadata={"file_size": 100},
-                embedding=[0.5, 0.5, 0.0] + [0.0] * 765
+                embedding=_vector(0.5, 0.5, 0.0)
             ),
-            CodeChunk(
+            replace(
+                chunk_template,
                 id="filter_test_js",
                 file_path="test.js",
                 content="function jsFunction() {\n}",
-                start_line=1,
-                end_line=2,
                 language="javascript",
-                chunk_type="function_definition",
                 metadata={"file_size": 80},
-                embedding=[0.5, 0.0, 0.5] + [0.0] * 765
+                embedding=_vector(0.5, 0.0, 0.5)
             )
         ]
         
-        milvus_client.insert_chunks(chunks)
-        milvus_client.flush()
+        milvus_client.insert_chunks(chunks, flush=False)
         
         # Search with language filter
-        query_vector = [0.5, 0.5, 0.0] + [0.0] * 765
+        query_vector = _vector(0.5, 0.5, 0.0)
         results = milvus_client.search_similar(
             query_vector,
             top_k=5,
-            filters={"language": "python"}
+            filter_expression='language == "python"',
+            consistency_level="Strong"
         )
         
         assert len(results) > 0
         # Note: Actual filter verification would depend on Milvus client implementation
         
-    def test_get_entity_by_id(self, milvus_client: MilvusClient, sample_code_file):
+    def test_get_entity_by_id(self, milvus_client: MilvusClient, sample_code_file, chunk_template: CodeChunk):
         """Test retrieving entity by ID."""
         # Insert test chunk
-        chunk = CodeChunk(
+        chunk = replace(
+            chunk_template,
             id="get_by_id_test",
             file_path=sample_code_file.path,
             content="def get_by_id_function():\n    return 'found'",
-            start_line=1,
-            end_line=2,
-            language="python",
-            chunk_type="function_definition",
-            metadata={"file_size": 100},
-            embedding=[0.7, 0.3, 0.0] + [0.0] * 765
+            embedding=_vector(0.7, 0.3, 0.0)
         )
         
-        milvus_client.insert_chunks([chunk])
-        milvus_client.flush()
+        milvus_client.insert_chunks([chunk], flush=False)
         
         # Retrieve by ID
-        result = milvus_client.get_chunk_by_id("get_by_id_test")
+        result = milvus_client.get_chunk_by_id("get_by_id_test", consistency_level="Strong")
         
         if result:  # May return None if not implemented
             assert result.id == "get_by_id_test"
             assert result.content == chunk.content
             
-    def test_batch_operations(self, milvus_client: MilvusClient, sample_code_file):
+    def test_batch_operations(self, milvus_client: MilvusClient, sample_code_file, chunk_template: CodeChunk):
         """Test batch insert operations."""
-        # Create large batch of chunks
+        # Create large batch of chunks, their embeddings rows of one seeded float32 matrix
+        embeddings = np.random.default_rng(0).standard_normal((50, 768), dtype=np.float32)
         chunks = []
         for i in range(50):
-            chunks.append(CodeChunk(
+            chunks.append(replace(
+                chunk_template,
                 id=f"batch_test_chunk_{i}",
                 file_path=sample_code_file.path,
                 content=f"def batch_function_{i}():\n    return {i}",
                 start_line=i * 2 + 1,
                 end_line=i * 2 + 2,
-                language="python",
-                chunk_type="function_definition",
                 metadata={"file_size": 100 + i},
-                embedding=np.random.rand(768).tolist()
+                embedding=embeddings[i]
             ))
         
         # Insert in batch
-        result = milvus_client.insert_chunks(chunks)
+        result = milvus_client.insert_chunks(chunks, flush=False)
         assert result is not None
         
-        milvus_client.flush()
-        
         # Verify all were inserted
         count = milvus_client.get_entity_count()
         assert count >= 50
@@ -212,18 +191,14 @@ class TestMilvusClient:
         assert isinstance(count, int)
         assert count >= 0
         
-    def test_error_handling(self, milvus_client: MilvusClient):
+    def test_error_handling(self, milvus_client: MilvusClient, chunk_template: CodeChunk):
         """Test error handling for invalid operations."""
         # Test with invalid embedding dimension
-        invalid_chunk = CodeChunk(
+        invalid_chunk = replace(
+            chunk_template,
             id="invalid_chunk",
             file_path="test.py",
             content="def invalid():\n    pass",
-            start_line=1,
-            end_line=2,
-            language="python",
-            chunk_type="function_definition",
-            metadata={"file_size": 100},
             embedding=[0.1, 0.2]  # Wrong dimension
         )
         
@@ -235,23 +210,18 @@ class TestMilvusClient:
             # Expected for invalid dimension
             assert "dimension" in str(e).lower() or "vector" in str(e).lower()
             
-    def test_cleanup(self, milvus_client: MilvusClient):
+    def test_cleanup(self, milvus_client: MilvusClient, chunk_template: CodeChunk):
         """Test cleanup operations."""
         # Insert some test data
-        chunk = CodeChunk(
+        chunk = replace(
+            chunk_template,
             id="cleanup_test_chunk",
             file_path="cleanup_test.py",
             content="def cleanup_function():\n    pass",
-            start_line=1,
-            end_line=2,
-            language="python",
-            chunk_type="function_definition",
-            metadata={"file_size": 100},
-            embedding=[0.1] * 768
+            embedding=np.full(768, 0.1, dtype=np.float32)
         )
         
-        milvus_client.insert_chunks([chunk])
-        milvus_client.flush()
+        milvus_client.insert_chunks([chunk], flush=False)
         
         # Verify data exists
         count_before = milvus_client.get_entity_count()
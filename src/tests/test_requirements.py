@@ -1,11 +1,9 @@
 import pytest
+import os
 import sys
-import importlib
+import importlib.util
 from pathlib import Path
 
-# Add src to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
-
 
 class TestRequirements:
     """Test that all required dependencies are available."""
@@ -25,12 +23,12 @@ class TestRequirements:
             'loguru'
         ]
         
+        # find_spec locates modules without importing them
         missing_modules = []
         for module_name in required_modules:
-            try:
-                importlib.import_module(module_name)
+            if importlib.util.find_spec(module_name) is not None:
                 print(f"✓ {module_name} available")
-            except ImportError:
+            else:
                 missing_modules.append(module_name)
                 print(f"✗ {module_name} missing")
         
@@ -51,11 +49,10 @@ class TestRequirements:
         missing_optional = []
         
         for module_name in optional_modules:
-            try:
-                importlib.import_module(module_name)
+            if importlib.util.find_spec(module_name) is not None:
                 available_optional.append(module_name)
                 print(f"✓ {module_name} available (optional)")
-            except ImportError:
+            else:
                 missing_optional.append(module_name)
                 print(f"? {module_name} missing (optional)")
         
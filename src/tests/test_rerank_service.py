@@ -0,0 +1,222 @@
+import pytest
+import asyncio
+import numpy as np
+from typing import List
+from pathlib import Path
+
+from src.types import CodeChunk, SearchResult, GraphNode, GraphEdge, GraphResult
+from src.graph.json_graph_client import JsonGraphClient
+from src.search.rerank_service import GraphReranker, ConflictResolutionReranker, GraphIndex, FEATURE_KEYS
+
+
+class CountingGraphClient(JsonGraphClient):
+    """JSON graph client that counts related-chunk lookups."""
+    
+    def __init__(self, storage_path: str):
+        super().__init__(storage_path)
+        self.batch_calls = 0
+    
+    def find_related_chunks_batch(self, chunk_ids, relationship_types=None, max_hops=2):
+        self.batch_calls += 1
+        return super().find_related_chunks_batch(chunk_ids, relationship_types, max_hops)
+
+
+def _make_results(count: int, search_type: str = "hybrid") -> List[SearchResult]:
+    """Create search results over simple python chunks."""
+    return [
+        SearchResult(
+            chunk=CodeChunk(
+                id=f"chunk_{i}",
+                file_path="rerank_test.py",
+                content=f"def func_{i}(x):\n    # doc\n    if x:\n        return {i}\n    return 0",
+                start_line=i * 5 + 1,
+                end_line=i * 5 + 5,
+                language="python",
+                chunk_type="function_definition",
+                metadata={},
+            ),
+            score=1.0 - i * 0.1,
+            rank=i + 1,
+            search_type=search_type,
+            metadata={},
+        )
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def rerank_graph(tmp_path: Path) -> CountingGraphClient:
+    """Create a small graph with functions defined in chunks."""
+    client = CountingGraphClient(str(tmp_path / "rerank_graph.json"))
+    with client.bulk():
+        for result in _make_results(5):
+            chunk = result.chunk
+            client.create_chunk_node(chunk)
+            qualified_name = f"{chunk.file_path}::func_{chunk.id.split('_')[1]}"
+            client.create_function_node(qualified_name.split("::")[1], qualified_name,
+                                        chunk.file_path, chunk.start_line, {})
+            client.create_function_chunk_relationship(qualified_name, chunk.id)
+        client.create_function_call_relationship("rerank_test.py::func_0", "rerank_test.py::func_1")
+    return client
+
+
+class TestGraphReranker:
+    """Test graph-based reranking."""
+    
+    def test_rerank_results(self, rerank_graph: CountingGraphClient):
+        """Test reranked results are sorted, ranked and truncated."""
+        reranker = GraphReranker(rerank_graph)
+        
+        results = asyncio.run(reranker.rerank_results(_make_results(5), "func_3", top_k=3))
+        
+        assert len(results) == 3
+        assert [r.rank for r in results] == [1, 2, 3]
+        assert all(a.score >= b.score for a, b in zip(results, results[1:]))
+        assert all("graph_score" in r.metadata for r in results)
+    
+    def test_rerank_uses_single_graph_lookup(self, rerank_graph: CountingGraphClient):
+        """Test that graph context is fetched once for all results."""
+        reranker = GraphReranker(rerank_graph)
+        
+        asyncio.run(reranker.rerank_results(_make_results(5), "func", top_k=5))
+        
+        assert rerank_graph.batch_calls == 1
+    
+    def test_rerank_skips_chunks_missing_from_graph(self, rerank_graph: CountingGraphClient):
+        """Test chunks that are not graph nodes get no graph score."""
+        reranker = GraphReranker(rerank_graph)
+        results = _make_results(7)
+        
+        results = asyncio.run(reranker.rerank_results(results, "func", top_k=7))
+        
+        graph_scores = {r.chunk.id: r.metadata["graph_score"] for r in results}
+        assert graph_scores["chunk_5"] == 0.0
+        assert graph_scores["chunk_6"] == 0.0
+        assert graph_scores["chunk_0"] > 0.0
+    
+    def test_combine_scores(self, rerank_graph: CountingGraphClient):
+        """Test graph scores above the threshold get more weight."""
+        reranker = GraphReranker(rerank_graph)
+        reranker.threshold = 0.5
+        
+        combined = reranker._combine_scores(np.array([1.0, 1.0]), np.array([0.9, 0.1]))
+        
+        assert combined.tolist() == pytest.approx([0.6 + 0.4 * 0.9, 0.8 + 0.2 * 0.1])
+    
+    def test_calculate_feature_scores(self, rerank_graph: CountingGraphClient):
+        """Test features are clipped to [0, 1] and averaged by weight per row."""
+        reranker = GraphReranker(rerank_graph)
+        features = {key: 0.0 for key in FEATURE_KEYS}
+        features["function_depth"] = 5
+        features["query_function_matches"] = 0.5
+        
+        scores = reranker._calculate_feature_scores(np.array([
+            [features[key] for key in FEATURE_KEYS],
+            [0.0] * len(FEATURE_KEYS),
+        ]))
+        
+        assert scores.tolist() == pytest.approx([(0.1 * 1.0 + 0.3 * 0.5) / 1.6, 0.0])
+    
+    def test_rerank_empty_results(self, rerank_graph: CountingGraphClient):
+        """Test reranking nothing."""
+        reranker = GraphReranker(rerank_graph)
+        
+        assert asyncio.run(reranker.rerank_results([], "query")) == []
+        assert rerank_graph.batch_calls == 0
+    
+    def test_extract_graph_features(self, rerank_graph: CountingGraphClient):
+        """Test structural features computed from the graph index."""
+        nodes = [GraphNode(f"f{i}", "Function", {}, "a.py", i) for i in range(4)]
+        nodes += [GraphNode(f"c{i}", "Class", {}, "a.py", i) for i in range(3)]
+        edges = [
+            GraphEdge("f0", "f1", "CALLS", {}),
+            GraphEdge("f1", "f2", "CALLS", {}),
+            GraphEdge("f3", "f2", "CALLS", {}),
+            GraphEdge("c0", "c1", "INHERITS_FROM", {}),
+            GraphEdge("c2", "c1", "INHERITS_FROM", {}),
+        ]
+        graph_result = GraphResult(nodes=nodes, edges=edges, metadata={})
+        result = _make_results(1)[0]
+        result.chunk.id = "f2"
+        
+        features = GraphReranker(rerank_graph)._extract_graph_features(result, "f", graph_result)
+        features = dict(zip(FEATURE_KEYS, features.tolist()))
+        
+        assert features["function_depth"] == 2
+        assert features["class_hierarchy_depth"] == 1
+        assert features["call_frequency"] == pytest.approx(2 / 7)
+        assert features["degree_centrality"] == pytest.approx(2 / 7)
+        assert features["query_function_matches"] == 4
+    
+    def test_control_keywords_count_once_per_line(self, rerank_graph: CountingGraphClient):
+        """Test each control keyword counts at most once per line, as whole words only."""
+        reranker = GraphReranker(rerank_graph)
+        content = "if a if b else c\nfor x in y: info = format(x)\n" + "x" * 5000
+        
+        code_complexity, _ = reranker._analyze_chunk_text(content)
+        
+        # if + else on the first line, for on the second, per 1000 characters
+        assert code_complexity == pytest.approx(3 / (len(content) / 1000))
+    
+    def test_max_chain_depth(self, rerank_graph: CountingGraphClient):
+        """Test chain depth handles shared subtrees, cycles and long chains."""
+        reranker = GraphReranker(rerank_graph)
+        diamond = {"a": ["b", "c"], "b": ["d"], "c": ["d"], "d": ["e"]}
+        cycle = {"a": ["b"], "b": ["a"]}
+        long_chain = {f"n{i}": [f"n{i + 1}"] for i in range(5000)}
+        
+        assert reranker._max_chain_depth(diamond, ["b", "a"]) == 3
+        assert reranker._max_chain_depth(cycle, ["a"]) == 1
+        assert reranker._max_chain_depth(long_chain, ["n0"]) == 5000
+        assert reranker._max_chain_depth({}, ["a"]) == 0
+    
+    def test_graph_index(self):
+        """Test the graph index groups edges by type and direction."""
+        graph_result = GraphResult(
+            nodes=[GraphNode("a", "Function", {}, "a.py", 1), GraphNode("b", "Class", {}, "a.py", 2)],
+            edges=[GraphEdge("a", "b", "CALLS", {})],
+            metadata={},
+        )
+        
+        index = GraphIndex.from_graph_result(graph_result)
+        
+        assert index.out_edges("CALLS") == {"a": ["b"]}
+        assert index.in_edges("CALLS") == {"b": ["a"]}
+        assert index.out_edges("INHERITS_FROM") == {}
+        assert [node.id for node in index.nodes_of_type("Class")] == ["b"]
+        assert index.degrees[index.node_positions["a"]] == 1
+        assert index.degrees[index.node_positions["b"]] == 1
+
+
+class TestConflictResolutionReranker:
+    """Test conflict resolution between vector and BM25 results."""
+    
+    def test_resolve_conflicts(self):
+        """Test combined results are ranked and truncated."""
+        vector_results = _make_results(6, "vector")
+        bm25_results = list(reversed(_make_results(6, "bm25")))
+        
+        results = ConflictResolutionReranker().resolve_conflicts(
+            vector_results, bm25_results, "how to implement", top_k=4
+        )
+        
+        assert len(results) == 4
+        assert [r.rank for r in results] == [1, 2, 3, 4]
+        assert all(a.score >= b.score for a, b in zip(results, results[1:]))
+        assert len({r.chunk.id for r in results}) == 4
+    
+    def test_identify_conflicts(self):
+        """Test conflicts carry the other method's rank and result."""
+        vector_results = _make_results(8, "vector")
+        bm25_results = _make_results(8, "bm25")[::-1]
+        for rank, result in enumerate(bm25_results, start=1):
+            result.rank = rank
+        
+        conflicts = ConflictResolutionReranker()._identify_conflicts(vector_results, bm25_results)
+        by_chunk = {c["chunk_id"]: c for c in conflicts}
+        
+        assert by_chunk["chunk_0"]["type"] == "vector_high_bm25_low"
+        assert by_chunk["chunk_0"]["bm25_rank"] == 8
+        assert by_chunk["chunk_0"]["bm25_result"] is bm25_results[-1]
+        assert by_chunk["chunk_7"]["vector_rank"] == 8
+        assert by_chunk["chunk_7"]["vector_result"] is vector_results[-1]
@@ -1,9 +1,11 @@
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+from typing import List, Dict, Any, NamedTuple, Optional
+from dataclasses import dataclass, field
 from enum import Enum
 import json
 from pathlib import Path
 
+import numpy as np
+
 
 class FileType(Enum):
     """File type enumeration."""
@@ -14,7 +16,7 @@ class FileType(Enum):
     UNKNOWN = "unknown"
 
 
-@dataclass
+@dataclass(slots=True)
 class CodeFile:
     """Represents a code file in the codebase."""
     path: str
@@ -37,7 +39,7 @@ class CodeFile:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class CodeChunk:
     """Represents a chunk of code with metadata."""
     id: str
@@ -48,7 +50,13 @@ class CodeChunk:
     language: str
     chunk_type: str
     metadata: Dict[str, Any]
-    embedding: Optional[List[float]] = None
+    # Contiguous float32, the layout Milvus stores; excluded from == since arrays don't compare to bool
+    embedding: Optional[np.ndarray] = field(default=None, compare=False)
+    
+    def __post_init__(self):
+        """Store the embedding as a float32 array."""
+        if self.embedding is not None:
+            self.embedding = np.ascontiguousarray(self.embedding, dtype=np.float32)
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary."""
@@ -64,7 +72,13 @@ class CodeChunk:
         }
 
 
-@dataclass
+class SearchHit(NamedTuple):
+    """A search candidate's chunk id and score, before its chunk is loaded."""
+    id: str
+    score: float
+
+
+@dataclass(slots=True)
 class SearchResult:
     """Represents a search result."""
     chunk: CodeChunk
@@ -84,7 +98,7 @@ class SearchResult:
         }
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class GraphNode:
     """Represents a node in the code graph."""
     id: str
@@ -104,7 +118,7 @@ class GraphNode:
         }
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class GraphEdge:
     """Represents an edge in the code graph."""
     source_id: str
@@ -122,7 +136,7 @@ class GraphEdge:
         }
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class GraphResult:
     """Represents a graph query result."""
     nodes: List[GraphNode]
@@ -2,6 +2,9 @@ from loguru import logger
 from pathlib import Path
 import sys
 
+CONSOLE_COLOR_FORMAT = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+PLAIN_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+
 
 def setup_logging(log_level: str = "INFO", log_file: str = "logs/app.log"):
     """Setup logging configuration."""
@@ -12,22 +15,26 @@ def setup_logging(log_level: str = "INFO", log_file: str = "logs/app.log"):
     log_path = Path(log_file)
     log_path.parent.mkdir(parents=True, exist_ok=True)
     
-    # Console logger
+    # Console logger; colour only when a terminal will show it, not when output is captured or piped
+    is_tty = sys.stdout.isatty()
     logger.add(
         sys.stdout,
-        format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
+        format=CONSOLE_COLOR_FORMAT if is_tty else PLAIN_FORMAT,
         level=log_level,
-        colorize=True,
+        colorize=is_tty,
     )
     
-    # File logger
+    # File logger; records are written and rotated by a background thread, not the caller
     logger.add(
         log_file,
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
+        format=PLAIN_FORMAT,
         level=log_level,
         rotation="10 MB",
         retention="30 days",
         compression="zip",
+        enqueue=True,
+        backtrace=False,
+        diagnose=False,
     )
     
     return logger